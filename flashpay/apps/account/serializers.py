@@ -12,6 +12,8 @@ from flashpay.apps.account.tokens import CustomRefreshToken  # type: ignore[attr
 from flashpay.apps.account.utils import generate_api_key
 from flashpay.apps.core.models import Network
 from flashpay.apps.core.utils import decrypt_fernet_message
+from flashpay.apps.payments.models import PaymentLink
+from flashpay.apps.payments.utils import invalidate_payment_link_cache
 
 
 class APIKeySerializer(serializers.ModelSerializer):
@@ -39,6 +41,16 @@ class CreateAPIKeySerializer(APIKeySerializer):
         attrs["network"] = network
         return super().validate(attrs)
 
+    def create(self, validated_data: Any) -> Any:
+        api_key = super().create(validated_data)
+        # payment links show their account's public key to payers.
+        invalidate_payment_link_cache(
+            *PaymentLink.objects.filter(
+                account=api_key.account, network=api_key.network
+            ).values_list("slug", flat=True)
+        )
+        return api_key
+
 
 class BaseAccountSerializer(serializers.Serializer):
     payload = serializers.CharField(required=True)
@@ -28,6 +28,7 @@ from flashpay.apps.account.serializers import (
     WebhookSerializer,
 )
 from flashpay.apps.account.tokens import CustomRefreshToken  # type: ignore[attr-defined]
+from flashpay.apps.core.clients import get_indexer_client
 from flashpay.apps.core.models import Network
 
 if TYPE_CHECKING:
@@ -80,11 +81,7 @@ class AccountSetUpView(GenericAPIView):
     permission_classes: Sequence["_PermissionClass"] = [AllowAny]
 
     def get_indexer_client(self, network: Network) -> Any:
-        return (
-            settings.TESTNET_INDEXER_CLIENT
-            if network == Network.TESTNET
-            else settings.MAINNET_INDEXER_CLIENT
-        )
+        return get_indexer_client(network)
 
     def post(self, request: Request) -> Response:
         serializer = self.get_serializer(data=request.data)
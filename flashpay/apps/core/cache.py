@@ -0,0 +1,57 @@
+import time
+from typing import Callable, Optional, TypeVar, Union
+from uuid import uuid4
+
+from django.core.cache import cache
+
+T = TypeVar("T")
+
+
+def single_flight(
+    key: str,
+    fn: Callable[[], T],
+    result_timeout: Union[Optional[int], Callable[[T], Optional[int]]],
+    lock_timeout: int = 30,
+    max_wait: float = 2,
+    poll_interval: float = 0.05,
+) -> T:
+    """Runs `fn` for at most one caller at a time per `key` across every process sharing
+    the cache.
+
+    The result is cached for `result_timeout` seconds, or as many seconds as it returns when
+    given the result (None caches it forever, 0 not at all), and returned to every caller
+    asking for the same key meanwhile. Callers arriving while `fn` runs wait for its result
+    for up to `max_wait` seconds, so they don't tie up a worker for long, then run `fn`
+    themselves. The lock is dropped after `lock_timeout` seconds in case the runner crashed.
+    """
+    result_key = f"{key}:result"
+    lock_key = f"{key}:lock"
+    token = uuid4().hex
+    deadline = time.monotonic() + max_wait
+    while True:
+        # results are wrapped in a tuple so a `None` result can be told apart from a miss.
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached[0]  # type: ignore[no-any-return]
+        # only one caller can add the lock. A cache that is down returns None rather than
+        # False, in which case there is nothing to wait on.
+        acquired = cache.add(lock_key, token, timeout=lock_timeout)
+        if acquired is not False or time.monotonic() >= deadline:
+            break
+        time.sleep(poll_interval)
+
+    try:
+        result = fn()
+        timeout = result_timeout(result) if callable(result_timeout) else result_timeout
+        if timeout != 0:
+            cache.set(result_key, (result,), timeout=timeout)
+    finally:
+        # the lock may have expired and been taken by another caller while `fn` ran.
+        if acquired and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return result
+
+
+def clear_single_flight(*keys: str) -> None:
+    """Drops the results cached by `single_flight` for `keys`."""
+    cache.delete_many([f"{key}:result" for key in keys])
@@ -0,0 +1,151 @@
+from hashlib import sha1
+from typing import Any, Callable, Dict, Optional, Type
+
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from flashpay.apps.core.cache import single_flight
+from flashpay.apps.core.models import Network
+
+# Seconds a "not found" error of algod is cached for. The indexer's errors carry no status
+# code, so they are never cached.
+NOT_FOUND_TTL = 5
+
+# Seconds a confirmed transaction looked up on algod or the indexer is cached for. It can't
+# change once confirmed, but is rarely looked up again after a while, so it is left to expire.
+INDEXED_TRANSACTION_TTL = 60 * 60 * 24
+
+# Seconds the suggested params of a network are cached for. Transactions built from them stay
+# valid for 1000 rounds, so they can be shared by every payer for a while.
+SUGGESTED_PARAMS_TTL = 10
+
+
+def ttl(seconds: Optional[int]) -> Callable[[Any], Optional[int]]:
+    return lambda response: seconds
+
+
+# Maps the client methods whose responses are cached to a function returning how many
+# seconds to cache a response for, None to cache it forever and 0 to not cache it.
+# Methods that are not listed, e.g `status` or `search_transactions`, are never cached.
+ALGOD_CACHE_POLICY: Dict[str, Callable[[Any], Optional[int]]] = {
+    "account_info": ttl(10),
+    "asset_info": ttl(60 * 60),
+    "suggested_params": ttl(SUGGESTED_PARAMS_TTL),
+    # only confirmed transactions are cached, they can't change anymore.
+    "pending_transaction_info": lambda response: (
+        INDEXED_TRANSACTION_TTL if response.get("confirmed-round") else 0
+    ),
+}
+INDEXER_CACHE_POLICY: Dict[str, Callable[[Any], Optional[int]]] = {
+    "transaction": ttl(INDEXED_TRANSACTION_TTL),
+    "asset_info": ttl(60 * 60),
+}
+
+
+class CachedClient:
+    """Wraps the algod or indexer client of a network, caching the responses of its methods
+    following `policy` in the shared cache.
+
+    Concurrent identical calls are coalesced into a single upstream request, 404 errors are
+    cached for `NOT_FOUND_TTL` seconds and the number of requests and cache misses
+    of every cached method is counted (see `get_cache_stats`).
+    """
+
+    def __init__(
+        self,
+        network: Network,
+        kind: str,
+        policy: Dict[str, Callable[[Any], Optional[int]]],
+        error_class: Type[Exception],
+    ) -> None:
+        self.network = network
+        self.kind = kind
+        self.policy = policy
+        self.error_class = error_class
+
+    @property
+    def client(self) -> Any:
+        # resolved on every call so clients replaced on the settings are picked up.
+        return getattr(settings, f"{self.network.upper()}_{self.kind.upper()}_CLIENT")
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.client, name)
+        if name not in self.policy:
+            return method
+
+        def cached_method(*args: Any, **kwargs: Any) -> Any:
+            key = f"algorand:{self.network}:{self.kind}:{name}"
+            call_hash = sha1(repr((args, sorted(kwargs.items()))).encode()).hexdigest()
+            increment_counter(f"{key}:requests")
+
+            def fetch() -> Any:
+                increment_counter(f"{key}:misses")
+                try:
+                    return method(*args, **kwargs)
+                except self.error_class as e:
+                    if getattr(e, "code", None) != 404:
+                        raise
+                    return NotFound(str(e))
+
+            response = single_flight(
+                key=f"{key}:{call_hash}",
+                fn=fetch,
+                result_timeout=lambda response: (
+                    NOT_FOUND_TTL
+                    if isinstance(response, NotFound)
+                    else self.policy[name](response)
+                ),
+            )
+            if isinstance(response, NotFound):
+                raise self.error_class(response.message, 404)
+            return response
+
+        return cached_method
+
+
+class NotFound:
+    """Cached in place of a 404 response."""
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+def increment_counter(key: str) -> None:
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted since it was added.
+        pass
+
+
+def get_algod_client(network: Network) -> Any:
+    return CachedClient(network, "algod", ALGOD_CACHE_POLICY, AlgodHTTPError)
+
+
+def get_indexer_client(network: Network) -> Any:
+    return CachedClient(network, "indexer", INDEXER_CACHE_POLICY, IndexerHTTPError)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Dict[str, int]]]:
+    """Returns the number of cache hits and misses of every cached client method, e.g
+    `{"testnet_algod": {"account_info": {"hits": 10, "misses": 2}}}`.
+    """
+    stats: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for network in Network:
+        for kind, policy in (("algod", ALGOD_CACHE_POLICY), ("indexer", INDEXER_CACHE_POLICY)):
+            keys = {name: f"algorand:{network}:{kind}:{name}" for name in policy}
+            counters = cache.get_many(
+                [f"{key}:{counter}" for key in keys.values() for counter in ("requests", "misses")]
+            )
+            stats[f"{network}_{kind}"] = {}
+            for name, key in keys.items():
+                requests = counters.get(f"{key}:requests", 0)
+                misses = counters.get(f"{key}:misses", 0)
+                stats[f"{network}_{kind}"][name] = {
+                    "hits": max(requests - misses, 0),
+                    "misses": misses,
+                }
+    return stats
@@ -1,5 +1,137 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     ordering = "-created_at"
+
+
+class CustomCursorPagination(CursorPagination):
+    ordering = "-created_at"
+
+
+class KeysetPagination(BasePagination):
+    """Paginates the latest rows first on (`created_at`, `uid`) with opaque cursors, so every
+    page costs the same however deep it is.
+
+    No total count is run unless `?count=estimate` is passed, in which case the planner's
+    estimate is returned on PostgreSQL. Views whose querysets can't be filtered, e.g unions,
+    can apply the position of a cursor themselves by defining `filter_keyset`.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request: Request) -> bool:
+        return (
+            request.query_params.get("pagination") == "keyset"
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view: Optional[Any] = None
+    ) -> List[Any]:
+        assert self.page_size is not None, "KeysetPagination needs a page size"
+        self.request = request
+        self.count = (
+            self.estimate_count(queryset)
+            if request.query_params.get(self.count_query_param) == "estimate"
+            else None
+        )
+
+        cursor = self.decode_cursor(request)
+        reverse = False
+        if cursor is not None:
+            created_at, uid, reverse = cursor
+            # the outer bound lets the planner start the index range at the cursor, rather
+            # than walk every row before it to test the tie-break on `uid`.
+            if reverse:
+                condition = Q(created_at__gte=created_at) & (
+                    Q(created_at__gt=created_at) | Q(uid__gt=uid)
+                )
+            else:
+                condition = Q(created_at__lte=created_at) & (
+                    Q(created_at__lt=created_at) | Q(uid__lt=uid)
+                )
+            filter_keyset = getattr(view, "filter_keyset", None)
+            queryset = (
+                filter_keyset(queryset, condition)
+                if filter_keyset is not None
+                else queryset.filter(condition)
+            )
+
+        ordering = ("created_at", "uid") if reverse else ("-created_at", "-uid")
+        # one extra row tells whether there is a page past this one.
+        results = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_link(self.page[0], reverse=True)
+
+    def get_link(self, row: Any, reverse: bool) -> str:
+        position = json.dumps([row.created_at.isoformat(), str(row.uid), reverse])
+        cursor = urlsafe_b64encode(position.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), "pagination")
+        return str(replace_query_param(url, self.cursor_query_param, cursor))
+
+    def decode_cursor(self, request: Request) -> Optional[Tuple[datetime, UUID, bool]]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            created_at, uid, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), UUID(uid), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def estimate_count(queryset: QuerySet) -> Optional[int]:
+        """Returns the number of rows the planner expects `queryset` to return, if known."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
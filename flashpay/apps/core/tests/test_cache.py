@@ -0,0 +1,67 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+
+from flashpay.apps.core.cache import single_flight
+
+
+def slow_fn() -> str:
+    time.sleep(0.1)
+    return "result"
+
+
+def test_single_flight_runs_once_for_concurrent_callers() -> None:
+    fn = mock.Mock(side_effect=slow_fn)
+    results = []
+
+    def call() -> None:
+        results.append(single_flight("key", fn, result_timeout=5, poll_interval=0.01))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    fn.assert_called_once()
+    assert results == ["result"] * 5
+
+    # the result is reused until it expires.
+    assert single_flight("key", fn, result_timeout=5) == "result"
+    fn.assert_called_once()
+    assert single_flight("other-key", fn, result_timeout=5) == "result"
+    assert fn.call_count == 2
+
+
+def test_single_flight_caches_none_results() -> None:
+    fn = mock.Mock(return_value=None)
+
+    assert single_flight("key", fn, result_timeout=5) is None
+    assert single_flight("key", fn, result_timeout=5) is None
+    fn.assert_called_once()
+
+
+def test_single_flight_releases_lock_on_error() -> None:
+    fn = mock.Mock(side_effect=[ValueError("Kaboom!"), "result"])
+
+    try:
+        single_flight("key", fn, result_timeout=5)
+    except ValueError:
+        pass
+    # a failed run is not cached and does not keep others waiting.
+    assert single_flight("key", fn, result_timeout=5, lock_timeout=1) == "result"
+
+
+def test_single_flight_caps_the_wait_and_keeps_others_locks() -> None:
+    fn = mock.Mock(return_value="result")
+    cache.set("key:lock", "other-token")
+
+    # the holder of the lock never finishes, so the caller gives up waiting and runs `fn`.
+    start = time.monotonic()
+    assert single_flight("key", fn, result_timeout=0, max_wait=0.1, poll_interval=0.01)
+    assert time.monotonic() - start < 1
+    fn.assert_called_once()
+    # a lock held by someone else is left alone.
+    assert cache.get("key:lock") == "other-token"
@@ -0,0 +1,89 @@
+from unittest import mock
+
+import pytest
+from algosdk.error import AlgodHTTPError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.test import APIClient
+
+from flashpay.apps.core.clients import (
+    INDEXED_TRANSACTION_TTL,
+    get_algod_client,
+    get_indexer_client,
+)
+from flashpay.apps.core.models import Network
+
+
+def test_cached_client_follows_policy() -> None:
+    algod_client = get_algod_client(Network.TESTNET)
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT,
+        "pending_transaction_info",
+        return_value={"confirmed-round": 0},
+    ) as pending_transaction_info:
+        # pending transactions are not cached.
+        assert algod_client.pending_transaction_info("TXID") == {"confirmed-round": 0}
+        assert algod_client.pending_transaction_info("TXID") == {"confirmed-round": 0}
+        assert pending_transaction_info.call_count == 2
+
+        # confirmed ones are, for as long as indexed transactions.
+        pending_transaction_info.return_value = {"confirmed-round": 100}
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            assert algod_client.pending_transaction_info("TXID") == {"confirmed-round": 100}
+        assert cache_set.call_args.kwargs["timeout"] == INDEXED_TRANSACTION_TTL
+        assert algod_client.pending_transaction_info("TXID") == {"confirmed-round": 100}
+        assert pending_transaction_info.call_count == 3
+        assert algod_client.pending_transaction_info("OTHERTXID") == {"confirmed-round": 100}
+        assert pending_transaction_info.call_count == 4
+
+    # methods without a policy are passed through.
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT, "status", return_value={"last-round": 1}
+    ) as algod_status:
+        algod_client.status()
+        algod_client.status()
+        assert algod_status.call_count == 2
+
+
+def test_cached_client_caches_not_found() -> None:
+    algod_client = get_algod_client(Network.MAINNET)
+    with mock.patch.object(
+        settings.MAINNET_ALGOD_CLIENT,
+        "pending_transaction_info",
+        side_effect=AlgodHTTPError("txn does not exist", code=404),
+    ) as pending_transaction_info:
+        for _ in range(2):
+            with pytest.raises(AlgodHTTPError) as e:
+                algod_client.pending_transaction_info("TXID")
+            assert e.value.code == 404
+        pending_transaction_info.assert_called_once()
+
+        # other errors are not cached.
+        pending_transaction_info.side_effect = AlgodHTTPError("Kaboom!", code=500)
+        for _ in range(2):
+            with pytest.raises(AlgodHTTPError):
+                algod_client.pending_transaction_info("OTHERTXID")
+        assert pending_transaction_info.call_count == 3
+
+
+@pytest.mark.django_db
+def test_healthcheck_cache_view(api_client: APIClient) -> None:
+    indexer_client = get_indexer_client(Network.TESTNET)
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "transaction",
+        return_value={"transaction": {"id": "TXID"}},
+    ):
+        for _ in range(3):
+            indexer_client.transaction("TXID")
+
+    response = api_client.get("/api/core/health/cache")
+    assert response.status_code == 401
+
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {settings.ASSETS_UPLOAD_API_KEY}")
+    response = api_client.get("/api/core/health/cache")
+    assert response.status_code == 200
+    assert response.data["data"]["testnet_indexer"]["transaction"] == {"hits": 2, "misses": 1}
+    assert response.data["data"]["mainnet_algod"]["account_info"] == {"hits": 0, "misses": 0}
@@ -2,6 +2,7 @@ from django.urls import path
 
 from flashpay.apps.core.views import (
     AssetView,
+    HealthCheckCacheView,
     HealthCheckThirdPartyView,
     HealthCheckView,
     PingView,
@@ -12,4 +13,5 @@ urlpatterns = [
     path("/health", HealthCheckView.as_view()),
     path("/assets", AssetView.as_view()),
     path("/health/thirdparty", HealthCheckThirdPartyView.as_view()),
+    path("/health/cache", HealthCheckCacheView.as_view()),
 ]
@@ -1,10 +1,17 @@
 from base64 import b64decode
+from functools import lru_cache
 
 from cryptography.fernet import Fernet
 
 from django.conf import settings
 
 
+@lru_cache(maxsize=1)
+def get_fernet(key: str) -> Fernet:
+    """Returns the Fernet instance of a key, built once per process."""
+    return Fernet(key.encode())
+
+
 def decrypt_fernet_message(payload: str) -> str:
     """Takes a base64 encoded Fernet encrypted message and decrypts it.
 
@@ -13,7 +20,7 @@ def decrypt_fernet_message(payload: str) -> str:
     - InvalidToken
     """
     b64_decoded_payload = b64decode(payload.encode())
-    fernet = Fernet(settings.ENCRYPTION_KEY.encode())
+    fernet = get_fernet(settings.ENCRYPTION_KEY)
     decrypted_payload = fernet.decrypt(b64_decoded_payload).decode()
 
     return str(decrypted_payload)
@@ -21,5 +28,5 @@ def decrypt_fernet_message(payload: str) -> str:
 
 def encrypt_fernet_message(message: str) -> bytes:
     """Encrypts a message using Fernet and returns the decoded format."""
-    fernet = Fernet(settings.ENCRYPTION_KEY)
+    fernet = get_fernet(settings.ENCRYPTION_KEY)
     return fernet.encrypt(message.encode())
@@ -1,5 +1,5 @@
 import logging
-from typing import Any, List
+from typing import Any, List, Optional
 
 from algosdk.error import AlgodHTTPError, AlgodResponseError, IndexerHTTPError
 
@@ -10,12 +10,15 @@ from django.http import HttpRequest, JsonResponse
 from rest_framework import status
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.generics import GenericAPIView, ListCreateAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from flashpay.apps.account.authentication import AssetsUploadAuthentication
+from flashpay.apps.core.clients import get_cache_stats
 from flashpay.apps.core.models import Asset
+from flashpay.apps.core.paginators import KeysetPagination
 from flashpay.apps.core.serializers import AssetSerializer
 
 logger = logging.getLogger(__name__)
@@ -104,6 +107,22 @@ class HealthCheckThirdPartyView(GenericAPIView):
         )
 
 
+class HealthCheckCacheView(GenericAPIView):
+    # the stats are internal, so they are only shown to holders of the internal API key.
+    authentication_classes = [AssetsUploadAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request: Request) -> Response:
+        return Response(
+            data={
+                "status_code": status.HTTP_200_OK,
+                "message": "Cache stats returned successfully",
+                "data": get_cache_stats(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class AssetView(ListCreateAPIView):
     queryset = Asset.objects.all()
     serializer_class = AssetSerializer
@@ -159,3 +178,15 @@ def handler_500(request: HttpRequest) -> JsonResponse:
         },
         status=status.HTTP_500_INTERNAL_SERVER_ERROR,
     )
+
+
+class KeysetPaginationMixin(GenericAPIView):
+    """Lets clients of a list view opt into `KeysetPagination` with `?pagination=keyset`,
+    or by following one of its cursors, instead of paginating by page number.
+    """
+
+    @property
+    def paginator(self) -> Optional[BasePagination]:
+        if not hasattr(self, "_paginator") and KeysetPagination.is_requested(self.request):
+            self._paginator = KeysetPagination()
+        return super().paginator
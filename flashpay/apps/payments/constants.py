@@ -1,4 +1,68 @@
+import re
+from datetime import timedelta
 from decimal import Decimal
 from typing import Final
 
 ZERO_AMOUNT: Final = Decimal("0.0000")
+
+# `fp_` + 32 hex chars of a uuid + `_` + 6 hex chars. See `generate_txn_reference`.
+TXN_REFERENCE_LENGTH: Final = 42
+TXN_REFERENCE_PATTERN: Final = re.compile(r"fp_[0-9a-f]{32}_[0-9a-f]{6}")
+
+# Maximum number of results the indexer returns per page.
+INDEXER_PAGE_LIMIT: Final = 1000
+
+# Name of the `RoundCheckpoint` advanced by the `follow_blocks` command.
+BLOCK_FOLLOWER_CHECKPOINT: Final = "block_follower"
+
+# Seconds the block follower waits before retrying after algod fails to respond.
+BLOCK_FOLLOWER_RETRY_DELAY: Final = 5
+
+# Delays between the verification attempts enqueued for a new transaction. Transactions still
+# pending after the last attempt are left to the periodic sweep.
+VERIFICATION_SCHEDULE: Final = (
+    timedelta(seconds=5),
+    timedelta(seconds=15),
+    timedelta(seconds=45),
+    timedelta(minutes=2),
+    timedelta(minutes=10),
+)
+
+# Seconds a verification result is reused for polls of the same transaction reference.
+VERIFY_TRANSACTION_RESULT_TIMEOUT: Final = 3
+
+# Seconds the ASAs an address is opted into are cached for when validating recipients.
+OPTED_IN_ASA_IDS_TIMEOUT: Final = 5 * 60
+
+# Seconds an address found not opted into an ASA is remembered for, so checks of its payment
+# links don't all reach algod while it isn't.
+NOT_OPTED_IN_ASA_TIMEOUT: Final = 15
+
+# Value of the revenue endpoints' `granularity` parameter reading revenue at the coarsest
+# granularity still giving a useful series over the `date_range`, rather than by day.
+REVENUE_AUTO_GRANULARITY: Final = "auto"
+# Granularities picked by `REVENUE_AUTO_GRANULARITY`. Revenue of every date is read by month.
+REVENUE_GRANULARITY_BY_DATE_RANGE: Final = {"30d": "day", "6m": "week", "year": "month"}
+OPEN_RANGE_REVENUE_GRANULARITY: Final = "month"
+
+# Value of the revenue endpoint's `format` parameter returning series as parallel lists.
+REVENUE_COLUMNAR_FORMAT: Final = "columnar"
+
+# Maximum number of periods of a columnar revenue series, e.g 1000 days or 41 days of hours.
+REVENUE_COLUMNAR_MAX_PERIODS: Final = 1000
+
+# Seconds the revenue summary of an account is cached for.
+REVENUE_SUMMARY_TIMEOUT: Final = 60
+
+# Number of payment links updated per query when repairing their counters.
+PAYMENT_LINK_COUNTERS_BATCH_SIZE: Final = 1000
+
+# Number of latest transactions shown with a payment link. The rest are paginated.
+RECENT_TRANSACTIONS_LIMIT: Final = 5
+
+# Seconds the payload of a payment link shown to payers is cached for. It is invalidated when
+# the link is updated, paid or its account's API key is rotated.
+PAYMENT_LINK_CACHE_TIMEOUT: Final = 60
+
+# Seconds an unknown payment link slug is cached for.
+PAYMENT_LINK_NOT_FOUND_TIMEOUT: Final = 10
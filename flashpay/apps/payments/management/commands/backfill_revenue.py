@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from logging import getLogger
+from multiprocessing import Pool
+from typing import Any, Iterator, Tuple
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections
+from django.utils import timezone
+
+from flashpay.apps.core.models import Network
+from flashpay.apps.payments.models import RevenueBackfill
+from flashpay.apps.payments.tasks import calculate_daily_revenue, calculate_period_revenues
+
+logger = getLogger(__name__)
+
+
+def backfill_day(network_and_day: Tuple[Network, date]) -> Tuple[date, int]:
+    """Recomputes the daily and hourly revenues of a day, in a worker process if parallel."""
+    network, day = network_and_day
+    return day, calculate_daily_revenue(network, day, rollup_periods=False)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily revenues and revenue rollups of a network over a range of days. "
+        "Resumes from the last day backfilled by a previous run from the same day."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--network", choices=Network.values, default=Network.MAINNET)
+        parser.add_argument(
+            "--from", dest="from_date", type=date.fromisoformat, required=True, help="YYYY-MM-DD"
+        )
+        parser.add_argument(
+            "--to",
+            dest="to_date",
+            type=date.fromisoformat,
+            default=None,
+            help="YYYY-MM-DD, today by default.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of days to backfill in parallel processes.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Backfill the whole range again instead of resuming.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        network = Network(options["network"])
+        from_date: date = options["from_date"]
+        to_date: date = options["to_date"] or timezone.now().date()
+        processes: int = options["processes"]
+        if from_date > to_date:
+            raise CommandError("--from must not be after --to")
+        if processes < 1:
+            raise CommandError("--processes must be at least 1")
+
+        # runs from the same day share their progress, so a run resumed on a later day without
+        # `--to` carries on from where the last one stopped.
+        backfill, _ = RevenueBackfill.objects.get_or_create(
+            network=network, from_date=from_date, defaults={"to_date": to_date}
+        )
+        backfill.to_date = to_date
+        if options["restart"]:
+            backfill.last_date = None
+        backfill.save(update_fields=["to_date", "last_date", "updated_at"])
+        start = from_date if backfill.last_date is None else backfill.last_date + timedelta(1)
+        if start > to_date:
+            self.stdout.write(f"{network} revenues from {from_date} to {to_date} are backfilled")
+            return
+        self.stdout.write(f"Backfilling {network} revenues from {start} to {to_date}")
+
+        days = ((network, start + timedelta(i)) for i in range((to_date - start).days + 1))
+        if processes == 1:
+            self.backfill(network, backfill, to_date, map(backfill_day, days))
+            return
+
+        # forked workers must not share the parent's database connections.
+        connections.close_all()
+        with Pool(processes) as pool:
+            # results come back in order so the checkpoint only covers contiguous days.
+            self.backfill(network, backfill, to_date, pool.imap(backfill_day, days))
+
+    def backfill(
+        self,
+        network: Network,
+        backfill: RevenueBackfill,
+        to_date: date,
+        results: Iterator[Tuple[date, int]],
+    ) -> None:
+        corrected = 0
+        for day, day_corrected in results:
+            next_day = day + timedelta(1)
+            # the weekly and monthly rollups are summed up once their last day is backfilled,
+            # here, so parallel workers never upsert the same rollups.
+            if day == to_date or next_day.weekday() == 0 or next_day.day == 1:
+                day_corrected += calculate_period_revenues(network, day)
+            corrected += day_corrected
+            backfill.last_date = day
+            backfill.save(update_fields=["last_date", "updated_at"])
+            if day_corrected:
+                logger.info(f"Corrected {day_corrected} {network} revenue(s) of {day}")
+        self.stdout.write(f"Backfilled {network} revenues, {corrected} row(s) corrected")
@@ -0,0 +1,78 @@
+import time
+from logging import getLogger
+from typing import Any, Optional
+from urllib.error import URLError
+
+import msgpack
+from algosdk.error import AlgodHTTPError
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.transaction import atomic
+from django.utils import timezone
+
+from flashpay.apps.core.clients import get_algod_client
+from flashpay.apps.core.models import Network
+from flashpay.apps.payments.constants import BLOCK_FOLLOWER_CHECKPOINT, BLOCK_FOLLOWER_RETRY_DELAY
+from flashpay.apps.payments.models import RoundCheckpoint
+from flashpay.apps.payments.tasks import complete_block_transactions
+
+logger = getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Follows new blocks on algod and marks pending transactions paid in them as "
+        "successful. Resumes from the last processed round of the network."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--network", choices=Network.values, default=Network.MAINNET)
+        parser.add_argument(
+            "--max-blocks",
+            type=int,
+            default=None,
+            help="Stop after processing this many blocks instead of running forever.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        network = Network(options["network"])
+        max_blocks: Optional[int] = options["max_blocks"]
+        algod_client = get_algod_client(network)
+        checkpoint, created = RoundCheckpoint.objects.get_or_create(
+            network=network, name=BLOCK_FOLLOWER_CHECKPOINT
+        )
+        if created or checkpoint.last_round == 0:
+            # start from the tip instead of replaying the whole chain.
+            checkpoint.last_round = algod_client.status()["last-round"] - 1
+        next_round = checkpoint.last_round + 1
+        self.stdout.write(f"Following {network} blocks from round {next_round}")
+
+        processed_blocks = 0
+        while max_blocks is None or processed_blocks < max_blocks:
+            try:
+                # blocks until a round after `next_round - 1` is available.
+                last_round = algod_client.status_after_block(round_num=next_round - 1)[
+                    "last-round"
+                ]
+                while next_round <= last_round and (
+                    max_blocks is None or processed_blocks < max_blocks
+                ):
+                    raw_block = algod_client.block_info(
+                        round_num=next_round, response_format="msgpack"
+                    )
+                    block = msgpack.unpackb(raw_block, raw=False, strict_map_key=False)
+                    with atomic():
+                        completed = complete_block_transactions(network, block["block"])
+                        RoundCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                            last_round=next_round, updated_at=timezone.now()
+                        )
+                    if completed:
+                        logger.info(f"Completed {completed} transaction(s) in round {next_round}")
+                    next_round += 1
+                    processed_blocks += 1
+            except (AlgodHTTPError, URLError):
+                logger.warning(
+                    f"Unable to fetch round {next_round} from {network} algod, retrying",
+                    exc_info=True,
+                )
+                time.sleep(BLOCK_FOLLOWER_RETRY_DELAY)
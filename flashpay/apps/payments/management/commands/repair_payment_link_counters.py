@@ -0,0 +1,16 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from flashpay.apps.payments.utils import recalculate_payment_link_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the total revenue, successful payment count and last payment time of every "
+        "payment link from its successful transactions."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        corrected = recalculate_payment_link_counters()
+        self.stdout.write(f"Corrected the counters of {corrected} payment link(s)")
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.15 on 2026-10-17 07:40
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_auto_20221002_2118'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundCheckpoint',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('network', models.CharField(choices=[('mainnet', 'Mainnet'), ('testnet', 'Testnet')], default='mainnet', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(null=True)),
+                ('name', models.CharField(max_length=50)),
+                ('last_round', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='roundcheckpoint',
+            constraint=models.UniqueConstraint(fields=('network', 'name'), name='unique_round_checkpoint_per_network'),
+        ),
+    ]
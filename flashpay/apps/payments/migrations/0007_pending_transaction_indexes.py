@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+from flashpay.apps.core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # the indexes are built concurrently so writes to transactions aren't blocked meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('payments', '0006_transaction_verification_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('success', 'Success'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=50),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_check_at'], name='pending_txn_next_check_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='pending_txn_created_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.15 on 2026-10-17 07:53
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def set_daily_revenue_dates(apps, schema_editor):
+    DailyRevenue = apps.get_model("payments", "DailyRevenue")
+    DailyRevenue.objects.update(date=TruncDate("created_at"))
+
+    # revenues used to be recomputed in full, so of the duplicates of a day the latest holds
+    # the right amount.
+    seen = set()
+    duplicates = []
+    for revenue in DailyRevenue.objects.order_by("-updated_at").only(
+        "uid", "account_id", "asset_id", "network", "date"
+    ):
+        key = (revenue.account_id, revenue.asset_id, revenue.network, revenue.date)
+        if key in seen:
+            duplicates.append(revenue.uid)
+        seen.add(key)
+    DailyRevenue.objects.filter(uid__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_pending_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrevenue',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(set_daily_revenue_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dailyrevenue',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenue',
+            constraint=models.UniqueConstraint(fields=('account', 'asset', 'network', 'date'), name='unique_daily_revenue_per_day'),
+        ),
+    ]
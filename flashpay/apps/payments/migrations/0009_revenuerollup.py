@@ -0,0 +1,39 @@
+# Generated by Django 3.2.15 on 2026-10-17 07:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_add_token_blacklist'),
+        ('core', '0002_alter_asset_network'),
+        ('payments', '0008_dailyrevenue_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('network', models.CharField(choices=[('mainnet', 'Mainnet'), ('testnet', 'Testnet')], default='mainnet', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(null=True)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('amount', models.DecimalField(decimal_places=4, max_digits=16)),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='account.account')),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='core.asset')),
+            ],
+            options={
+                'ordering': ['period_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('account', 'asset', 'network', 'granularity', 'period_start'), name='unique_revenue_rollup_per_period'),
+        ),
+    ]
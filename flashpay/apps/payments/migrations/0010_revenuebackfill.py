@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:00
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueBackfill',
+            fields=[
+                ('uid', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('network', models.CharField(choices=[('mainnet', 'Mainnet'), ('testnet', 'Testnet')], default='mainnet', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(null=True)),
+                ('from_date', models.DateField()),
+                ('to_date', models.DateField()),
+                ('last_date', models.DateField(null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='revenuebackfill',
+            constraint=models.UniqueConstraint(fields=('network', 'from_date'), name='unique_revenue_backfill_per_start'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_revenuebackfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='payment_link',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='payments.paymentlink'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:02
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_transaction_payment_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentlink',
+            name='last_paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentlink',
+            name='successful_payment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentlink',
+            name='total_revenue',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=16),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:10
+
+from django.db import migrations, models
+
+from flashpay.apps.core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # the indexes are built concurrently so writes to transactions aren't blocked meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('payments', '0012_payment_link_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['recipient', 'network', '-created_at'], name='txn_recipient_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['sender', 'network', '-created_at'], name='txn_sender_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:41
+
+from django.db import migrations, models
+
+from flashpay.apps.core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # the index is built concurrently so writes to transactions aren't blocked meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('payments', '0013_transaction_address_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'expired')), fields=['created_at'], name='expired_txn_created_idx'),
+        ),
+    ]
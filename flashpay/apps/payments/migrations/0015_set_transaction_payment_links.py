@@ -0,0 +1,59 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:48
+
+from uuid import UUID
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def set_transaction_payment_links(apps, schema_editor):
+    PaymentLink = apps.get_model("payments", "PaymentLink")
+    Transaction = apps.get_model("payments", "Transaction")
+
+    # transactions are read in batches by uid, each batch committing on its own so the table
+    # is never locked for long and an interrupted run resumes with the transactions left.
+    last_uid = None
+    while True:
+        transactions = Transaction.objects.filter(payment_link__isnull=True).order_by("uid")
+        if last_uid is not None:
+            transactions = transactions.filter(uid__gt=last_uid)
+        batch = list(transactions.values_list("uid", "txn_reference")[:BATCH_SIZE])
+        if not batch:
+            return
+        last_uid = batch[-1][0]
+
+        # references of payment link transactions are `fp_<payment link uid hex>_<suffix>`.
+        references = {}
+        for txn_uid, txn_reference in batch:
+            try:
+                references[txn_uid] = UUID(txn_reference.split("_")[1])
+            except (IndexError, ValueError):
+                continue
+        payment_link_uids = set(
+            PaymentLink.objects.filter(uid__in=set(references.values())).values_list(
+                "uid", flat=True
+            )
+        )
+        with transaction.atomic():
+            Transaction.objects.bulk_update(
+                [
+                    Transaction(uid=txn_uid, payment_link_id=uid)
+                    for txn_uid, uid in references.items()
+                    if uid in payment_link_uids
+                ],
+                fields=["payment_link"],
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('payments', '0014_expired_transaction_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_transaction_payment_links, migrations.RunPython.noop),
+    ]
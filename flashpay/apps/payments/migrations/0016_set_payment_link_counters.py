@@ -0,0 +1,56 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:50
+
+from django.db import migrations, transaction
+from django.db.models import Count, Max, Sum
+
+BATCH_SIZE = 1000
+
+
+def set_payment_link_counters(apps, schema_editor):
+    PaymentLink = apps.get_model("payments", "PaymentLink")
+    Transaction = apps.get_model("payments", "Transaction")
+
+    # payment links are read in batches by uid, the counters of each batch summed up with one
+    # grouped aggregate and committed on their own so the tables are never locked for long.
+    last_uid = None
+    while True:
+        payment_links = PaymentLink.objects.order_by("uid")
+        if last_uid is not None:
+            payment_links = payment_links.filter(uid__gt=last_uid)
+        uids = list(payment_links.values_list("uid", flat=True)[:BATCH_SIZE])
+        if not uids:
+            return
+        last_uid = uids[-1]
+
+        counters = (
+            Transaction.objects.filter(status="success", payment_link_id__in=uids)
+            .values("payment_link_id")
+            .annotate(total=Sum("amount"), count=Count("uid"), last_paid_at=Max("updated_at"))
+            .order_by()
+        )
+        with transaction.atomic():
+            PaymentLink.objects.bulk_update(
+                [
+                    PaymentLink(
+                        uid=counter["payment_link_id"],
+                        total_revenue=counter["total"],
+                        successful_payment_count=counter["count"],
+                        last_paid_at=counter["last_paid_at"],
+                    )
+                    for counter in counters
+                ],
+                fields=["total_revenue", "successful_payment_count", "last_paid_at"],
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('payments', '0015_set_transaction_payment_links'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_payment_link_counters, migrations.RunPython.noop),
+    ]
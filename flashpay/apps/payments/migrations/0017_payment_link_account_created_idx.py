@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-17 08:51
+
+from django.db import migrations, models
+
+from flashpay.apps.core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # the index is built concurrently so writes to payment links aren't blocked meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('payments', '0016_set_payment_link_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='paymentlink',
+            index=models.Index(fields=['account', 'network', '-created_at'], name='link_account_created_idx'),
+        ),
+    ]
@@ -1,12 +1,10 @@
 import secrets
 import uuid
-from decimal import Decimal
 from typing import Iterable, Optional
 
 from algosdk.constants import ADDRESS_LEN
 
 from django.db import models
-from django.db.models import QuerySet, Sum
 
 from flashpay.apps.core.models import BaseModel, Network
 from flashpay.apps.payments.constants import ZERO_AMOUNT
@@ -16,6 +14,16 @@ class TransactionStatus(models.TextChoices):
     PENDING = "pending"
     SUCCESS = "success"
     FAILED = "failed"
+    # pending for longer than `PENDING_TRANSACTION_TTL`, e.g an abandoned checkout.
+    EXPIRED = "expired"
+
+
+class RevenueGranularity(models.TextChoices):
+    HOUR = "hour"
+    # daily revenues are kept as `DailyRevenue`s.
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
 
 
 class TransactionType(models.TextChoices):
@@ -45,6 +53,10 @@ class PaymentLink(BaseModel):
     is_active = models.BooleanField(default=True)
     has_fixed_amount = models.BooleanField(default=False)
     is_one_time = models.BooleanField(default=False)
+    # kept up to date as its transactions succeed, see `mark_transaction_as_successful`.
+    total_revenue = models.DecimalField(max_digits=16, decimal_places=4, default=ZERO_AMOUNT)
+    successful_payment_count = models.PositiveIntegerField(default=0)
+    last_paid_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:
         return f"PaymentLink {self.name}"
@@ -60,20 +72,14 @@ class PaymentLink(BaseModel):
             self.slug = secrets.token_urlsafe(5)
         super().save(force_insert, force_update, using, update_fields)
 
-    @property
-    def total_revenue(self) -> Decimal:
-        total: Optional[Decimal] = Transaction.objects.filter(
-            network=self.network,
-            txn_reference__icontains=self.uid.hex,
-            status=TransactionStatus.SUCCESS,
-        ).aggregate(Sum("amount"))["amount__sum"]
-        return total if total is not None else ZERO_AMOUNT
-
-    def transactions(self) -> QuerySet:
-        return Transaction.objects.filter(txn_reference__icontains=self.uid.hex)
-
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # an account's latest payment links, see `PaymentLinkView`.
+            models.Index(
+                fields=["account", "network", "-created_at"], name="link_account_created_idx"
+            ),
+        ]
 
 
 class Transaction(models.Model):
@@ -94,12 +100,23 @@ class Transaction(models.Model):
         blank=False,
     )
     recipient = models.CharField(max_length=ADDRESS_LEN, null=False, blank=False)
+    payment_link = models.ForeignKey(
+        PaymentLink,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transactions",
+    )
     txn_hash = models.TextField(null=True, blank=True)
     amount = models.DecimalField(max_digits=16, decimal_places=4, null=False, blank=False)
     status = models.CharField(
         max_length=50, choices=TransactionStatus.choices, default=TransactionStatus.PENDING
     )
     network = models.CharField(max_length=20, choices=Network.choices, default=Network.TESTNET)
+    # verification state of pending transactions, see `schedule_transaction_verification`.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_check_at = models.DateTimeField(null=True, blank=True)
+    checked_round = models.BigIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -108,6 +125,33 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # only pending transactions are indexed so verifying and expiring them stays cheap
+            # however large the transaction history grows.
+            models.Index(
+                fields=["next_check_at"],
+                name="pending_txn_next_check_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(
+                fields=["created_at"],
+                name="pending_txn_created_idx",
+                condition=models.Q(status="pending"),
+            ),
+            # expired transactions are verified again for a while, see `verify_transactions_task`.
+            models.Index(
+                fields=["created_at"],
+                name="expired_txn_created_idx",
+                condition=models.Q(status="expired"),
+            ),
+            # an account's latest transactions, received or sent, see `TransactionsView`.
+            models.Index(
+                fields=["recipient", "network", "-created_at"], name="txn_recipient_created_idx"
+            ),
+            models.Index(
+                fields=["sender", "network", "-created_at"], name="txn_sender_created_idx"
+            ),
+        ]
 
 
 class DailyRevenue(BaseModel):
@@ -124,9 +168,90 @@ class DailyRevenue(BaseModel):
         blank=False,
     )
     amount = models.DecimalField(max_digits=16, decimal_places=4, null=False, blank=False)
+    # the day the revenue was made on.
+    date = models.DateField()
 
     def __str__(self) -> str:
         return f"DailyRevenue for {self.account}"
 
     class Meta:
         ordering = ["created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "asset", "network", "date"],
+                name="unique_daily_revenue_per_day",
+            )
+        ]
+
+
+class RevenueRollup(BaseModel):
+    """The revenue of an account per asset over an hour, a week (starting on Monday) or a
+    month, kept in sync with `DailyRevenue`.
+    """
+
+    account = models.ForeignKey(
+        to="account.Account",
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=False,
+    )
+    asset = models.ForeignKey(
+        "core.Asset",
+        on_delete=models.DO_NOTHING,
+        null=False,
+        blank=False,
+    )
+    granularity = models.CharField(max_length=10, choices=RevenueGranularity.choices)
+    period_start = models.DateTimeField()
+    amount = models.DecimalField(max_digits=16, decimal_places=4, null=False, blank=False)
+
+    def __str__(self) -> str:
+        return f"RevenueRollup ({self.granularity}) for {self.account}"
+
+    class Meta:
+        ordering = ["period_start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "asset", "network", "granularity", "period_start"],
+                name="unique_revenue_rollup_per_period",
+            )
+        ]
+
+
+class RoundCheckpoint(BaseModel):
+    """The last Algorand round a reconciliation process has fully processed on a network."""
+
+    name = models.CharField(max_length=50, null=False, blank=False)
+    last_round = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"RoundCheckpoint {self.name} ({self.network}) at round {self.last_round}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["network", "name"], name="unique_round_checkpoint_per_network"
+            )
+        ]
+
+
+class RevenueBackfill(BaseModel):
+    """The progress of the `backfill_revenue` command from a day on a network, shared by every
+    run from that day whatever day it runs to.
+    """
+
+    from_date = models.DateField()
+    # the last day of the latest run.
+    to_date = models.DateField()
+    # the last day of the range, with every day before it, that was backfilled.
+    last_date = models.DateField(null=True)
+
+    def __str__(self) -> str:
+        return f"RevenueBackfill ({self.network}) from {self.from_date}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["network", "from_date"], name="unique_revenue_backfill_per_start"
+            )
+        ]
@@ -1,10 +1,16 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Dict, List
 from uuid import UUID
 
 from django.conf import settings
+from django.utils import timezone
 
 from rest_framework.serializers import (
+    BooleanField,
     CharField,
+    DateTimeField,
+    DictField,
+    IntegerField,
     ModelSerializer,
     Serializer,
     SerializerMethodField,
@@ -13,8 +19,13 @@ from rest_framework.serializers import (
 )
 
 from flashpay.apps.core.serializers import AssetSerializer
-from flashpay.apps.payments.models import DailyRevenue, PaymentLink, Transaction
-from flashpay.apps.payments.utils import check_if_address_opted_in_asa, generate_txn_reference
+from flashpay.apps.payments.constants import TXN_REFERENCE_PATTERN
+from flashpay.apps.payments.models import DailyRevenue, PaymentLink, RevenueRollup, Transaction
+from flashpay.apps.payments.utils import (
+    check_if_address_opted_in_asa,
+    generate_txn_reference,
+    prefetch_recent_transactions,
+)
 from flashpay.apps.payments.validators import IsValidAlgorandAddress
 
 
@@ -71,17 +82,20 @@ class TransactionSerializer(ModelSerializer):
         )
         read_only_fields = (
             "txn_hash",
-            "txn_reference",
             "created_at",
             "updated_at",
             "network",
             "status",
         )
+        # a reference can be generated ahead, e.g by the checkout endpoint, to sign with.
+        extra_kwargs = {"txn_reference": {"required": False}}
         validators = [IsValidAlgorandAddress(fields=["recipient", "sender"])]
 
     def create(self, validated_data: Any) -> Any:
         payment_link_uid = validated_data.pop("payment_link", None)
-        validated_data["txn_reference"] = generate_txn_reference(uid=payment_link_uid)
+        if "txn_reference" not in validated_data:
+            validated_data["txn_reference"] = generate_txn_reference(uid=payment_link_uid)
+        validated_data["payment_link_id"] = payment_link_uid
         validated_data["network"] = self.context["request"].network
         return super().create(validated_data)
 
@@ -106,6 +120,13 @@ class TransactionSerializer(ModelSerializer):
                 detail={"asset": "This asset is not available for the specified network."}
             )
 
+        if "txn_reference" in attrs:
+            uid = attrs.get("payment_link", None)
+            if not TXN_REFERENCE_PATTERN.fullmatch(attrs["txn_reference"]) or (
+                uid is not None and attrs["txn_reference"].split("_")[1] != uid.hex
+            ):
+                raise ValidationError({"txn_reference": "Invalid transaction reference"})
+
         if attrs["sender"] == attrs["recipient"]:
             raise ValidationError({"sender": "Sender's address cannot be the same as recipient"})
 
@@ -171,7 +192,8 @@ class PaymentLinkSerializer(ModelSerializer):
     creator = SerializerMethodField()
     asset = AssetSerializer()
     image_url = SerializerMethodField()
-    transactions = TransactionSerializer(many=True)
+    # the latest transactions only, the rest are paginated by `PaymentLinkTransactionsView`.
+    transactions = SerializerMethodField()
 
     def get_image_url(self, obj: PaymentLink) -> str:
         return str(obj.image.url) if bool(obj.image) else str(settings.DEFAULT_PAYMENT_LINK_IMAGE)
@@ -179,6 +201,12 @@ class PaymentLinkSerializer(ModelSerializer):
     def get_creator(self, obj: PaymentLink) -> str:
         return obj.account.address  # type: ignore
 
+    def get_transactions(self, obj: PaymentLink) -> List[Dict[str, Any]]:
+        # set for every link of a page at once by `prefetch_recent_transactions`.
+        if not hasattr(obj, "recent_transactions"):
+            prefetch_recent_transactions([obj])
+        return TransactionSerializer(obj.recent_transactions, many=True).data  # type: ignore
+
     class Meta:
         model = PaymentLink
         fields = (
@@ -190,6 +218,8 @@ class PaymentLinkSerializer(ModelSerializer):
             "slug",
             "amount",
             "total_revenue",
+            "successful_payment_count",
+            "last_paid_at",
             "image_url",
             "is_active",
             "has_fixed_amount",
@@ -199,18 +229,56 @@ class PaymentLinkSerializer(ModelSerializer):
             "updated_at",
             "transactions",
         )
+        read_only_fields = ("total_revenue", "successful_payment_count", "last_paid_at")
 
 
 class VerifyTransactionSerializer(Serializer):
     txn_reference = CharField(max_length=42)
+    # id of the onchain transaction, when known, to skip searching for it by reference.
+    txid = CharField(max_length=52, required=False)
 
 
 class DailyRevenueSerializer(ModelSerializer):
     asa_id = SerializerMethodField()
+    # kept for callers predating `date`, as the start of the revenue's day rather than when
+    # the row was created, which is later for backfilled or reconciled days.
+    created_at = SerializerMethodField()
 
     class Meta:
         model = DailyRevenue
-        fields = ("asa_id", "amount", "created_at")
+        fields = ("asa_id", "amount", "date", "created_at")
 
     def get_asa_id(self, obj: DailyRevenue) -> int:
         return obj.asset.asa_id
+
+    def get_created_at(self, obj: DailyRevenue) -> str:
+        day_start = timezone.make_aware(datetime.combine(obj.date, datetime.min.time()))
+        return str(DateTimeField().to_representation(day_start))
+
+
+class RevenueRollupSerializer(ModelSerializer):
+    asa_id = SerializerMethodField()
+
+    class Meta:
+        model = RevenueRollup
+        fields = ("asa_id", "amount", "period_start")
+
+    def get_asa_id(self, obj: RevenueRollup) -> int:
+        return obj.asset.asa_id
+
+
+class SuggestedParamsSerializer(Serializer):
+    fee = IntegerField()
+    flat_fee = BooleanField()
+    first = IntegerField()
+    last = IntegerField()
+    gh = CharField()
+    gen = CharField()
+    min_fee = IntegerField(allow_null=True)
+
+
+class PaymentLinkCheckoutSerializer(Serializer):
+    payment_link = DictField()
+    recipient_opted_in = BooleanField(allow_null=True)
+    txn_reference = CharField()
+    suggested_params = SuggestedParamsSerializer(allow_null=True)
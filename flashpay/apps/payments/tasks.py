@@ -1,6 +1,13 @@
 import hmac
 import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from uuid import UUID
 
 import requests
 from algosdk.error import IndexerHTTPError
@@ -8,18 +15,42 @@ from huey import crontab
 from huey.contrib.djhuey import db_periodic_task, db_task, lock_task
 
 from django.conf import settings
-from django.db.models import Sum
+from django.db.models import F, Q, QuerySet, Sum
+from django.db.models.functions import TruncHour
+from django.db.transaction import atomic, on_commit
 from django.utils import timezone
 
 from flashpay.apps.account.models import Account, APIKey, Webhook
-from flashpay.apps.core.models import Asset, Network
-from flashpay.apps.payments.constants import ZERO_AMOUNT
-from flashpay.apps.payments.models import DailyRevenue, PaymentLink, Transaction, TransactionStatus
+from flashpay.apps.core.clients import get_indexer_client
+from flashpay.apps.core.models import Network
+from flashpay.apps.payments.constants import VERIFICATION_SCHEDULE
+from flashpay.apps.payments.models import (
+    DailyRevenue,
+    RevenueGranularity,
+    RevenueRollup,
+    Transaction,
+    TransactionStatus,
+)
 from flashpay.apps.payments.serializers import TransactionSerializer
-from flashpay.apps.payments.utils import verify_transaction
+from flashpay.apps.payments.utils import (
+    get_block_transaction_id,
+    get_completable_transactions_filter,
+    get_expired_transactions_completable_since,
+    get_min_round,
+    get_period_end,
+    get_period_start,
+    get_txn_reference_from_note,
+    mark_transaction_as_successful,
+    search_recipient_transactions,
+    to_indexer_transaction,
+    verify_transaction,
+)
 
 logger = getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 @db_task(retries=5, retry_delay=1800)
 def send_webhook_transaction_status_task(account: Account, transaction: Transaction) -> None:
@@ -74,94 +105,472 @@ def send_webhook_transaction_status_task(account: Account, transaction: Transact
                 )
 
 
-def calculate_daily_revenue(network: Network) -> None:
-    now = timezone.now().date()
-    accounts = Account.objects.filter(is_verified=True)
-    assets = Asset.objects.filter(network=network)
-    for account in accounts:
-        for asset in assets:
-            try:
-                revenue = DailyRevenue.objects.get(
-                    network=network,
-                    account=account,
-                    asset=asset,
-                    created_at__date=now,
-                )
-            except DailyRevenue.DoesNotExist:
-                revenue = DailyRevenue.objects.create(
-                    account=account,
-                    asset=asset,
-                    amount=ZERO_AMOUNT,
+def calculate_daily_revenue(
+    network: Network, day: Optional[date] = None, rollup_periods: bool = True
+) -> int:
+    """Computes the revenue every verified account made per asset on `day` (today by
+    default) with a single grouped aggregate and upserts it as `DailyRevenue`s, along with the
+    hourly rollups of the day and the weekly and monthly rollups the day falls in.
+
+    Revenues are incremented as transactions succeed (see `add_to_revenue`), so this only
+    corrects drift. Only the (account, asset) pairs with successful transactions get rows.
+    The weekly and monthly rollups are only recomputed if `rollup_periods` is set.
+    Returns the number of rows created or corrected.
+    """
+    # a local of its own, the narrowed parameter isn't seen by the lambdas below.
+    revenue_day = timezone.now().date() if day is None else day
+    day_start = timezone.make_aware(datetime.combine(revenue_day, datetime.min.time()))
+    revenues = list(
+        Transaction.objects.filter(
+            network=network,
+            status=TransactionStatus.SUCCESS,
+            updated_at__date=revenue_day,
+        )
+        .annotate(hour=TruncHour("updated_at"))
+        .values("recipient", "asset__uid", "hour")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    accounts = Account.objects.filter(
+        is_verified=True, address__in={revenue["recipient"] for revenue in revenues}
+    ).in_bulk(field_name="address")
+
+    daily_totals: Dict[tuple, Decimal] = defaultdict(Decimal)
+    hourly_totals: Dict[tuple, Decimal] = {}
+    for revenue in revenues:
+        account = accounts.get(revenue["recipient"])
+        if account is None:
+            continue
+        daily_totals[(account.pk, revenue["asset__uid"])] += revenue["total"]
+        hourly_totals[(account.pk, revenue["asset__uid"], revenue["hour"])] = revenue["total"]
+
+    with atomic():
+        corrected = upsert_revenues(
+            DailyRevenue.objects.filter(network=network, date=revenue_day),
+            daily_totals,
+            key=lambda revenue: (revenue.account_id, revenue.asset_id),
+            build=lambda key, amount: DailyRevenue(
+                account_id=key[0],
+                asset_id=key[1],
+                amount=amount,
+                network=network,
+                date=revenue_day,
+            ),
+        )
+        corrected += upsert_revenue_rollups(
+            network,
+            RevenueGranularity.HOUR,
+            day_start,
+            get_period_end(day_start, RevenueGranularity.DAY),
+            hourly_totals,
+        )
+        if rollup_periods:
+            corrected += calculate_period_revenues(network, revenue_day)
+    return corrected
+
+
+def calculate_period_revenues(network: Network, day: date) -> int:
+    """Sums up the weekly and monthly rollups `day` falls in from the daily revenues.
+    Returns the number of rows created or corrected.
+    """
+    corrected = 0
+    day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    with atomic():
+        for granularity in (RevenueGranularity.WEEK, RevenueGranularity.MONTH):
+            period_start = get_period_start(day_start, granularity)
+            period_end = get_period_end(period_start, granularity)
+            period_revenues = (
+                DailyRevenue.objects.filter(
                     network=network,
+                    date__gte=period_start.date(),
+                    date__lt=period_end.date(),
                 )
+                .values("account_id", "asset_id")
+                .annotate(total=Sum("amount"))
+                .order_by()
+            )
+            corrected += upsert_revenue_rollups(
+                network,
+                granularity,
+                period_start,
+                period_end,
+                {
+                    (revenue["account_id"], revenue["asset_id"], period_start): revenue["total"]
+                    for revenue in period_revenues
+                },
+            )
+    return corrected
 
-            total_revenue = Transaction.objects.filter(
-                asset=asset,
-                status=TransactionStatus.SUCCESS,
-                updated_at__date=now,
-                recipient__iexact=account.address,
-                network=network,
-            ).aggregate(total=Sum("amount"))["total"]
-            if total_revenue is not None:
-                revenue.amount = total_revenue
 
-            revenue.save()
+def upsert_revenue_rollups(
+    network: Network,
+    granularity: RevenueGranularity,
+    start: datetime,
+    end: datetime,
+    totals: Dict[tuple, Decimal],
+) -> int:
+    """Upserts the `granularity` rollups of a network between `start` and `end` from totals
+    keyed by (account pk, asset pk, period start).
+    """
+    return upsert_revenues(
+        RevenueRollup.objects.filter(
+            network=network,
+            granularity=granularity,
+            period_start__gte=start,
+            period_start__lt=end,
+        ),
+        totals,
+        key=lambda rollup: (rollup.account_id, rollup.asset_id, rollup.period_start),
+        build=lambda key, amount: RevenueRollup(
+            account_id=key[0],
+            asset_id=key[1],
+            period_start=key[2],
+            granularity=granularity,
+            amount=amount,
+            network=network,
+        ),
+    )
 
 
-@db_periodic_task(crontab(minute="*/5"))
-@lock_task("lock-verify-txns")
-def verify_transactions_task() -> None:
-    db_txns = Transaction.objects.filter(status=TransactionStatus.PENDING)
-    for db_txn in db_txns:
+def upsert_revenues(
+    existing: QuerySet,
+    totals: Dict[tuple, Decimal],
+    key: Callable[[Any], tuple],
+    build: Callable[[tuple, Decimal], Any],
+) -> int:
+    """Makes the revenue rows of `existing` match `totals` with one bulk create and one bulk
+    update, deleting the rows `totals` has no entry for, e.g those of transactions counted
+    twice or of accounts that are no longer verified. Returns the number of rows created,
+    updated or deleted.
+    """
+    existing_revenues = {key(revenue): revenue for revenue in existing}
+    new_revenues = []
+    updated_revenues = []
+    for revenue_key, total in totals.items():
+        revenue = existing_revenues.pop(revenue_key, None)
+        if revenue is None:
+            new_revenues.append(build(revenue_key, total))
+        elif revenue.amount != total:
+            revenue.amount = total
+            revenue.updated_at = timezone.now()
+            updated_revenues.append(revenue)
+    # the revenues left have no total anymore.
+    stale_uids = [revenue.uid for revenue in existing_revenues.values()]
+    if stale_uids:
+        existing.model.objects.filter(uid__in=stale_uids).delete()
+    existing.model.objects.bulk_create(new_revenues)
+    existing.model.objects.bulk_update(updated_revenues, fields=["amount", "updated_at"])
+    return len(new_revenues) + len(updated_revenues) + len(stale_uids)
+
+
+def reconcile_daily_revenue(network: Network) -> None:
+    """Corrects the revenues of yesterday and today, so transactions that succeeded right
+    before midnight are covered too.
+    """
+    today = timezone.now().date()
+    for day in (today - timedelta(days=1), today):
+        corrected = calculate_daily_revenue(network, day)
+        if corrected:
+            logger.warning(f"Corrected {corrected} {network} daily revenue(s) of {day}")
+
+
+def complete_transaction(db_txn: Transaction, onchain_txn: dict) -> None:
+    """Marks a verified transaction as successful and notifies its recipient."""
+    if not mark_transaction_as_successful(db_txn=db_txn, txn_hash=onchain_txn["id"]):
+        return
+
+    # only send webhook on successful transactions
+    try:
+        account = Account.objects.get(address=db_txn.recipient)
+    except Account.DoesNotExist:
+        return
+    on_commit(lambda: send_webhook_transaction_status_task(account, db_txn))
+
+
+def run_indexer_lookups(
+    network: Network, lookup: Callable[[T], R], items: Sequence[T]
+) -> List[Tuple[T, Optional[R]]]:
+    """Runs `lookup` for every item on a thread pool bounded by the network's
+    `TRANSACTIONS_VERIFICATION_MAX_WORKERS`, returning results in the order of `items`.
+
+    Lookups must only do network I/O; database access stays on the calling thread. An item
+    whose lookup raised `IndexerHTTPError` gets `None` as its result.
+    """
+    max_workers = settings.TRANSACTIONS_VERIFICATION_MAX_WORKERS[network]
+    durations: List[float] = []
+
+    def timed_lookup(item: T) -> Optional[R]:
+        started_at = time.monotonic()
         try:
-            indexer = (
-                settings.TESTNET_INDEXER_CLIENT
-                if db_txn.network == Network.TESTNET
-                else settings.MAINNET_INDEXER_CLIENT
-            )
-            results = indexer.search_transactions(
+            return lookup(item)
+        except IndexerHTTPError:
+            logger.warning(f"Indexer lookup failed on {network}", exc_info=True)
+            return None
+        finally:
+            durations.append(time.monotonic() - started_at)
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(timed_lookup, items))
+    logger.info(
+        f"Ran {len(items)} indexer lookup(s) on {network} in "
+        f"{time.monotonic() - started_at:.2f}s with {max_workers} worker(s), "
+        f"slowest lookup took {max(durations, default=0):.2f}s"
+    )
+    return list(zip(items, results))
+
+
+def find_transactions_by_reference(
+    network: Network, db_txns: Sequence[Transaction]
+) -> Tuple[List[Tuple[Transaction, dict]], Dict[UUID, int]]:
+    """Looks up every pending transaction on the indexer by its reference.
+
+    Returns the verified (db transaction, onchain transaction) pairs and, for every
+    transaction that was looked up successfully, the round it has been checked up to.
+    """
+    indexer = get_indexer_client(network)
+    min_rounds = {db_txn.uid: get_min_round([db_txn]) for db_txn in db_txns}
+
+    def lookup(db_txn: Transaction) -> dict:
+        return dict(
+            indexer.search_transactions(
                 note_prefix=db_txn.txn_reference.encode(),
                 address=db_txn.sender,
                 address_role="sender",
+                min_round=min_rounds[db_txn.uid],
             )
-            # TODO: Handle edge cases properly.
-            # this should be only one transaction.
-            for onchain_txn in results["transactions"]:
-                if not verify_transaction(db_txn=db_txn, onchain_txn=onchain_txn):
-                    continue
-
-                db_txn.status = TransactionStatus.SUCCESS
-                db_txn.txn_hash = onchain_txn["id"]
-                db_txn.save(update_fields=["status", "txn_hash"])
-
-                # check if the txn is related to a one-time payment link and disable it.
-                try:
-                    # at this point, a valid txn reference is expected.
-                    supposed_payment_link_uid = db_txn.txn_reference.split("_")[1]
-                    payment_link = PaymentLink.objects.get(uid=supposed_payment_link_uid)
-                    if payment_link.is_one_time and db_txn.amount > 0:
-                        payment_link.is_active = False
-                        payment_link.save()
-                except PaymentLink.DoesNotExist:
-                    pass
-
-                # only send webhook on successful transactions
-                if db_txn.status == TransactionStatus.SUCCESS:
-                    try:
-                        account = Account.objects.get(address=db_txn.recipient)
-                    except Account.DoesNotExist:
-                        continue
-                    else:
-                        send_webhook_transaction_status_task(account, db_txn)
-        except IndexerHTTPError:
+        )
+
+    matches = []
+    checked_rounds = {}
+    for db_txn, results in run_indexer_lookups(network, lookup, db_txns):
+        if results is None:
             continue
 
+        checked_rounds[db_txn.uid] = results["current-round"]
+        # TODO: Handle edge cases properly.
+        # this should be only one transaction.
+        for onchain_txn in results["transactions"]:
+            if verify_transaction(db_txn=db_txn, onchain_txn=onchain_txn):
+                matches.append((db_txn, onchain_txn))
+                break
+    return matches, checked_rounds
+
+
+def find_transactions_by_recipient(
+    network: Network, db_txns: Sequence[Transaction]
+) -> Tuple[List[Tuple[Transaction, dict]], Dict[UUID, int]]:
+    """Groups pending transactions by recipient and fetches each recipient's incoming
+    transactions once, matching them locally against the pending references.
+
+    Only transactions that have been checked before can be swept this way, the indexer being
+    searched from the oldest round they were checked up to, so the number of indexer calls
+    grows with the number of active merchants, not pending rows. Returns the same as
+    `find_transactions_by_reference`.
+    """
+    indexer = get_indexer_client(network)
+    pending: Dict[str, Dict[str, Transaction]] = defaultdict(dict)
+    for db_txn in db_txns:
+        pending[db_txn.recipient][db_txn.txn_reference] = db_txn
+    min_rounds = {
+        recipient: get_min_round(list(db_txns_by_reference.values()))
+        for recipient, db_txns_by_reference in pending.items()
+    }
+
+    def lookup(recipient: str) -> Tuple[List[dict], int]:
+        min_round = min_rounds[recipient]
+        assert min_round is not None, "Unchecked transactions are looked up by reference"
+        return search_recipient_transactions(
+            indexer_client=indexer, recipient=recipient, min_round=min_round
+        )
+
+    matches = []
+    checked_rounds = {}
+    for recipient, results in run_indexer_lookups(network, lookup, list(pending)):
+        if results is None:
+            continue
+
+        onchain_txns, current_round = results
+        db_txns_by_reference = pending[recipient]
+        for db_txn in db_txns_by_reference.values():
+            checked_rounds[db_txn.uid] = current_round
+        for onchain_txn in onchain_txns:
+            txn_reference = get_txn_reference_from_note(onchain_txn)
+            matched_txn = db_txns_by_reference.get(txn_reference) if txn_reference else None
+            if matched_txn is None or not verify_transaction(
+                db_txn=matched_txn, onchain_txn=onchain_txn
+            ):
+                continue
+            matches.append((matched_txn, onchain_txn))
+            del db_txns_by_reference[matched_txn.txn_reference]
+    return matches, checked_rounds
+
+
+def reconcile_transactions(network: Network, db_txns: Sequence[Transaction]) -> None:
+    """Verifies a network's pending transactions against the chain and records how far the
+    unmatched ones were checked, together with the status updates.
+    """
+    if settings.BATCHED_TRANSACTIONS_VERIFICATION:
+        # a payment may be confirmed before its transaction is created, so every transaction
+        # is first looked up by reference, with no bound, and only swept by recipient from
+        # the round it was checked up to afterwards.
+        unchecked_txns = [db_txn for db_txn in db_txns if db_txn.checked_round is None]
+        checked_txns = [db_txn for db_txn in db_txns if db_txn.checked_round is not None]
+        matches, checked_rounds = find_transactions_by_reference(network, unchecked_txns)
+        recipient_matches, recipient_checked_rounds = find_transactions_by_recipient(
+            network, checked_txns
+        )
+        matches.extend(recipient_matches)
+        checked_rounds.update(recipient_checked_rounds)
+    else:
+        matches, checked_rounds = find_transactions_by_reference(network, db_txns)
+
+    matched_uids = {db_txn.uid for db_txn, _ in matches}
+    unmatched_uids_by_round: Dict[int, List[UUID]] = defaultdict(list)
+    for uid, checked_round in checked_rounds.items():
+        if uid not in matched_uids:
+            unmatched_uids_by_round[checked_round].append(uid)
+
+    with atomic():
+        for db_txn, onchain_txn in matches:
+            complete_transaction(db_txn, onchain_txn)
+
+        # the sweep is a safety net, so unmatched transactions are checked again at the
+        # slowest interval of the verification schedule.
+        next_check_at = timezone.now() + VERIFICATION_SCHEDULE[-1]
+        for checked_round, uids in unmatched_uids_by_round.items():
+            Transaction.objects.filter(
+                uid__in=uids, status__in=[TransactionStatus.PENDING, TransactionStatus.EXPIRED]
+            ).update(
+                attempts=F("attempts") + 1,
+                next_check_at=next_check_at,
+                checked_round=checked_round,
+            )
+
+
+def schedule_transaction_verification(db_txn: Transaction) -> None:
+    """Enqueues the next verification attempt of a pending transaction following
+    `VERIFICATION_SCHEDULE`. Once the schedule is used up, the transaction is left to
+    `verify_transactions_task`.
+
+    The attempt is only enqueued once the current db transaction commits, so it never runs
+    before the row it verifies is visible.
+    """
+    delay = VERIFICATION_SCHEDULE[min(db_txn.attempts, len(VERIFICATION_SCHEDULE) - 1)]
+    db_txn.next_check_at = timezone.now() + delay
+    Transaction.objects.filter(uid=db_txn.uid).update(
+        attempts=db_txn.attempts,
+        next_check_at=db_txn.next_check_at,
+        checked_round=db_txn.checked_round,
+    )
+    if db_txn.attempts < len(VERIFICATION_SCHEDULE):
+        on_commit(
+            lambda: verify_transaction_task.schedule((db_txn.uid,), delay=delay.total_seconds())
+        )
+
+
+@db_task()
+def verify_transaction_task(txn_uid: UUID) -> None:
+    """Runs one scheduled verification attempt of a pending transaction."""
+    try:
+        db_txn = Transaction.objects.select_related("asset", "payment_link").get(
+            get_completable_transactions_filter(), uid=txn_uid
+        )
+    except Transaction.DoesNotExist:
+        return
+
+    matches, checked_rounds = find_transactions_by_reference(Network(db_txn.network), [db_txn])
+    if matches:
+        complete_transaction(*matches[0])
+        return
+
+    db_txn.attempts += 1
+    db_txn.checked_round = checked_rounds.get(db_txn.uid, db_txn.checked_round)
+    schedule_transaction_verification(db_txn)
+
+
+def complete_block_transactions(network: Network, block: dict) -> int:
+    """Completes the pending transactions paid by `pay`/`axfer` transactions of a msgpack
+    decoded block. Returns the number of transactions completed.
+    """
+    # a reference can be reused within a block, e.g by an underpayment, so each of its
+    # transactions is kept in block order and the first one that verifies completes it.
+    onchain_txns: Dict[str, List[dict]] = defaultdict(list)
+    for signed_txn in block.get("txns", []):
+        txn = signed_txn["txn"]
+        if txn["type"] not in ("pay", "axfer") or not txn.get("note", b"").startswith(b"fp_"):
+            continue
+        txid = get_block_transaction_id(txn, block, has_genesis_id=signed_txn.get("hgi", False))
+        onchain_txn = to_indexer_transaction(txn, txid)
+        txn_reference = get_txn_reference_from_note(onchain_txn)
+        if txn_reference is not None:
+            onchain_txns[txn_reference].append(onchain_txn)
+
+    if not onchain_txns:
+        return 0
+
+    completed = 0
+    db_txns = Transaction.objects.filter(
+        get_completable_transactions_filter(),
+        network=network,
+        txn_reference__in=onchain_txns.keys(),
+    ).select_related("asset", "payment_link")
+    for db_txn in db_txns:
+        for onchain_txn in onchain_txns[db_txn.txn_reference]:
+            if verify_transaction(db_txn=db_txn, onchain_txn=onchain_txn):
+                complete_transaction(db_txn, onchain_txn)
+                completed += 1
+                break
+    return completed
+
+
+@db_periodic_task(crontab(minute="*/5"))
+@lock_task("lock-verify-txns")
+def verify_transactions_task() -> None:
+    """Safety net for transactions whose scheduled verification attempts are due or used up,
+    including recently expired ones as a payment may land after its transaction expired.
+    """
+    is_due = Q(next_check_at__isnull=True) | Q(next_check_at__lte=timezone.now())
+    pending_txns = Transaction.objects.filter(is_due, status=TransactionStatus.PENDING)
+    # queried apart from pending ones so each query keeps to its partial index.
+    expired_txns = Transaction.objects.filter(
+        is_due,
+        status=TransactionStatus.EXPIRED,
+        created_at__gte=get_expired_transactions_completable_since(),
+    )
+    for network in Network:
+        network_txns = [
+            *pending_txns.filter(network=network).select_related("asset", "payment_link"),
+            *expired_txns.filter(network=network).select_related("asset", "payment_link"),
+        ]
+        if network_txns:
+            reconcile_transactions(network, network_txns)
+
+
+def expire_pending_transactions() -> int:
+    """Marks transactions pending for longer than `PENDING_TRANSACTION_TTL` as expired.
+    Returns the number of transactions expired.
+    """
+    now = timezone.now()
+    return Transaction.objects.filter(
+        status=TransactionStatus.PENDING,
+        created_at__lt=now - settings.PENDING_TRANSACTION_TTL,
+    ).update(status=TransactionStatus.EXPIRED, updated_at=now)
+
+
+@db_periodic_task(crontab(minute="0"))
+@lock_task("lock-expire-txns")
+def expire_pending_transactions_task() -> None:
+    expired = expire_pending_transactions()
+    if expired:
+        logger.info(f"Expired {expired} pending transaction(s)")
+
 
-@db_periodic_task(crontab(hour="*/1"))
+@db_periodic_task(crontab(minute="0"))
 @lock_task("testnet-daily-revenue-lock")
 def testnet_daily_revenue_task() -> None:
     try:
-        calculate_daily_revenue(Network.TESTNET)
+        reconcile_daily_revenue(Network.TESTNET)
     except Exception:
         logger.exception(
             "An error occurred while calculating testnet daily revenue due to: ",
@@ -169,11 +578,11 @@ def testnet_daily_revenue_task() -> None:
         )
 
 
-@db_periodic_task(crontab(hour="*/1"))
+@db_periodic_task(crontab(minute="0"))
 @lock_task("mainnet-daily-revenue-lock")
 def mainnet_daily_revenue_task() -> None:
     try:
-        calculate_daily_revenue(Network.MAINNET)
+        reconcile_daily_revenue(Network.MAINNET)
     except Exception:
         logger.exception(
             "An error occurred while calculating mainnet daily revenue due to: ",
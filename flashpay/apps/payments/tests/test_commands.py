@@ -0,0 +1,230 @@
+from base64 import b64decode
+from typing import Any, Dict, List, Optional
+from unittest import mock
+from uuid import UUID
+
+import msgpack
+import pytest
+from algosdk.future.transaction import AssetTransferTxn, PaymentTxn, SuggestedParams
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from flashpay.apps.account.models import Account
+from flashpay.apps.core.models import Asset
+from flashpay.apps.payments.constants import BLOCK_FOLLOWER_CHECKPOINT
+from flashpay.apps.payments.models import (
+    DailyRevenue,
+    Network,
+    RevenueBackfill,
+    RevenueGranularity,
+    RevenueRollup,
+    RoundCheckpoint,
+    Transaction,
+    TransactionStatus,
+)
+
+SENDER = "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI"
+GENESIS_ID = "testnet-v1.0"
+GENESIS_HASH = "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+
+
+class FakeAlgodClient:
+    """Replays recorded msgpack blocks through the subset of the algod api used to follow
+    blocks."""
+
+    def __init__(self, blocks: Dict[int, List[Any]]) -> None:
+        self.blocks = {
+            round_num: self.encode_block(round_num, txns) for round_num, txns in blocks.items()
+        }
+
+    @staticmethod
+    def encode_block(round_num: int, txns: List[Any]) -> bytes:
+        signed_txns = []
+        for txn in txns:
+            txn_fields = txn.dictify()
+            # blocks elide the genesis information from their transactions.
+            del txn_fields["gh"], txn_fields["gen"]
+            signed_txns.append({"txn": txn_fields, "sig": b"\x00" * 64, "hgi": True})
+        block = {
+            "rnd": round_num,
+            "gen": GENESIS_ID,
+            "gh": b64decode(GENESIS_HASH),
+            "txns": signed_txns,
+        }
+        return bytes(msgpack.packb({"block": block, "cert": {}}, use_bin_type=True))
+
+    def status(self) -> dict:
+        return {"last-round": max(self.blocks)}
+
+    def status_after_block(self, round_num: int) -> dict:
+        return self.status()
+
+    def block_info(self, round_num: int, response_format: Optional[str] = None) -> bytes:
+        return self.blocks[round_num]
+
+
+def suggested_params() -> SuggestedParams:  # type: ignore[no-any-unimported]
+    return SuggestedParams(
+        fee=1000, first=1, last=1000, gh=GENESIS_HASH, gen=GENESIS_ID, flat_fee=True
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_follow_blocks_command(
+    account: Account,
+    algo_asa: Asset,
+    usdc_asa: Asset,
+    random_algorand_address: str,
+) -> None:
+    algo_txn, usdc_txn, unpaid_txn = (
+        Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=i).hex}_03ef72",
+            txn_type="normal",
+            amount=2,
+            asset=asset,
+            recipient=account.address,
+            sender=SENDER,
+        )
+        for i, asset in enumerate([algo_asa, usdc_asa, usdc_asa])
+    )
+    pay = PaymentTxn(
+        SENDER, suggested_params(), account.address, 2_000_000, note=algo_txn.txn_reference
+    )
+    axfer = AssetTransferTxn(
+        SENDER,
+        suggested_params(),
+        account.address,
+        2_000_000,
+        usdc_asa.asa_id,
+        note=usdc_txn.txn_reference,
+    )
+    # a later transaction reusing a reference in the same block doesn't hide its payment.
+    underpaid_axfer = AssetTransferTxn(
+        SENDER,
+        suggested_params(),
+        account.address,
+        1_000_000,
+        usdc_asa.asa_id,
+        note=usdc_txn.txn_reference,
+    )
+    # a payment to someone else carrying a pending reference is not accepted.
+    hijacked_pay = PaymentTxn(
+        SENDER,
+        suggested_params(),
+        random_algorand_address,
+        2_000_000,
+        note=unpaid_txn.txn_reference,
+    )
+    unrelated_pay = PaymentTxn(SENDER, suggested_params(), random_algorand_address, 1)
+    algod_client = FakeAlgodClient(
+        {
+            10: [unrelated_pay],
+            11: [pay, hijacked_pay],
+            12: [axfer, underpaid_axfer],
+        }
+    )
+    RoundCheckpoint.objects.create(
+        network=Network.TESTNET, name=BLOCK_FOLLOWER_CHECKPOINT, last_round=9
+    )
+
+    with mock.patch.object(settings, "TESTNET_ALGOD_CLIENT", algod_client):
+        call_command("follow_blocks", "--network", "testnet", "--max-blocks", "2")
+
+        algo_txn.refresh_from_db()
+        assert algo_txn.status == TransactionStatus.SUCCESS
+        assert algo_txn.txn_hash == pay.get_txid()
+        assert Transaction.objects.get(uid=usdc_txn.uid).status == TransactionStatus.PENDING
+        checkpoint = RoundCheckpoint.objects.get(
+            network=Network.TESTNET, name=BLOCK_FOLLOWER_CHECKPOINT
+        )
+        assert checkpoint.last_round == 11
+
+        # resumes from the checkpoint.
+        call_command("follow_blocks", "--network", "testnet", "--max-blocks", "1")
+
+    usdc_txn.refresh_from_db()
+    assert usdc_txn.status == TransactionStatus.SUCCESS
+    assert usdc_txn.txn_hash == axfer.get_txid()
+    assert Transaction.objects.get(uid=unpaid_txn.uid).status == TransactionStatus.PENDING
+    checkpoint.refresh_from_db()
+    assert checkpoint.last_round == 12
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_backfill_revenue_command(account: Account, usdc_asa: Asset) -> None:
+    today = timezone.now().date()
+    for days_ago in (1, 2, 3):
+        txn = Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=days_ago).hex}_03ef72",
+            txn_type="normal",
+            amount=days_ago,
+            asset=usdc_asa,
+            recipient=account.address,
+            sender=SENDER,
+            network=Network.TESTNET,
+            status=TransactionStatus.SUCCESS,
+        )
+        Transaction.objects.filter(uid=txn.uid).update(
+            updated_at=timezone.now() - timezone.timedelta(days=days_ago)
+        )
+
+    def backfill() -> None:
+        call_command(
+            "backfill_revenue",
+            "--network",
+            "testnet",
+            "--from",
+            str(today - timezone.timedelta(days=3)),
+            "--to",
+            str(today - timezone.timedelta(days=1)),
+        )
+
+    backfill()
+    assert {
+        revenue.date: revenue.amount
+        for revenue in DailyRevenue.objects.filter(network=Network.TESTNET)
+    } == {today - timezone.timedelta(days=days_ago): days_ago for days_ago in (1, 2, 3)}
+    assert (
+        sum(
+            RevenueRollup.objects.filter(
+                network=Network.TESTNET, granularity=RevenueGranularity.HOUR
+            ).values_list("amount", flat=True)
+        )
+        == 6
+    )
+    assert (
+        sum(
+            RevenueRollup.objects.filter(
+                network=Network.TESTNET, granularity=RevenueGranularity.MONTH
+            ).values_list("amount", flat=True)
+        )
+        == 6
+    )
+    assert RevenueBackfill.objects.get(network=Network.TESTNET).last_date == today - (
+        timezone.timedelta(days=1)
+    )
+
+    # a finished backfill is not run again.
+    DailyRevenue.objects.all().delete()
+    backfill()
+    assert not DailyRevenue.objects.exists()
+
+    # resumes after the last day backfilled.
+    RevenueBackfill.objects.update(last_date=today - timezone.timedelta(days=2))
+    backfill()
+    assert list(DailyRevenue.objects.values_list("date", flat=True)) == [
+        today - timezone.timedelta(days=1)
+    ]
+
+    # a run to a later day carries on from the last one instead of starting over.
+    DailyRevenue.objects.all().delete()
+    call_command(
+        "backfill_revenue", "--network", "testnet", "--from", str(today - timezone.timedelta(3))
+    )
+    assert not DailyRevenue.objects.exists()
+    backfill_progress = RevenueBackfill.objects.get(network=Network.TESTNET)
+    assert backfill_progress.to_date == backfill_progress.last_date == today
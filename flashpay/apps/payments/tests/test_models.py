@@ -32,6 +32,8 @@ def test_models() -> None:
         recipient="erguewrbfhvqo",
         txn_hash="wueyfbqwobv",
         amount=70,
+        payment_link=link,
     )
+    assert list(link.transactions.all()) == [txn]
     assert str(link) == f"PaymentLink {link.name}"
     assert str(txn) == f"Transaction {txn.txn_reference}"
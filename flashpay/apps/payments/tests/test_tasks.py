@@ -1,7 +1,18 @@
+import logging
+import threading
+import time
+from base64 import b64encode
+from datetime import timedelta
+from typing import Any
+from unittest import mock
 from uuid import UUID
 
 import pytest
+from algosdk.account import generate_account
+from algosdk.error import IndexerHTTPError
+from pytest_django.fixtures import SettingsWrapper
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -9,18 +20,24 @@ from rest_framework.test import APIClient
 
 from flashpay.apps.account.models import Account
 from flashpay.apps.core.models import Asset
+from flashpay.apps.payments.constants import VERIFICATION_SCHEDULE
 from flashpay.apps.payments.models import (
     DailyRevenue,
     Network,
     PaymentLink,
+    RevenueRollup,
     Transaction,
     TransactionStatus,
 )
 from flashpay.apps.payments.tasks import (
     calculate_daily_revenue,
+    expire_pending_transactions,
+    schedule_transaction_verification,
     send_webhook_transaction_status_task,
+    verify_transaction_task,
     verify_transactions_task,
 )
+from flashpay.apps.payments.utils import mark_transaction_as_successful
 
 
 @pytest.mark.django_db
@@ -68,6 +85,73 @@ def test_verify_transactions_task_task(
     assert transaction.status == TransactionStatus.SUCCESS
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transactions_task_batched_by_recipient(
+    account: Account,
+    usdc_asa: Asset,
+    random_algorand_address: str,
+) -> None:
+    sender = "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI"
+    paid, underpaid, unpaid = (
+        Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=i).hex}_03ef72",
+            txn_type="normal",
+            amount=10,
+            asset=usdc_asa,
+            recipient=account.address,
+            sender=sender,
+            # recipients are only swept once their transactions were looked up by reference.
+            checked_round=90,
+        )
+        for i in range(3)
+    )
+
+    def axfer(txn_id: str, txn: Transaction, amount: int) -> dict:
+        return {
+            "id": txn_id,
+            "tx-type": "axfer",
+            "sender": sender,
+            "note": b64encode(txn.txn_reference.encode()).decode(),
+            "asset-transfer-transaction": {
+                "receiver": account.address,
+                "amount": amount,
+                "asset-id": usdc_asa.asa_id,
+            },
+        }
+
+    onchain_txns = [
+        axfer("PAIDTXID", paid, 10_000_000),
+        axfer("UNDERPAIDTXID", underpaid, 1_000_000),
+        # payments to other merchants' references are ignored.
+        {"id": "OTHER", "tx-type": "pay", "sender": random_algorand_address, "note": None},
+    ]
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "search_transactions",
+        return_value={"current-round": 100, "transactions": onchain_txns},
+    ) as search_transactions:
+        verify_transactions_task.call_local()
+
+    # a single indexer call covers all of the recipient's pending transactions.
+    search_transactions.assert_called_once()
+    assert search_transactions.call_args.kwargs["address"] == account.address
+    assert search_transactions.call_args.kwargs["address_role"] == "receiver"
+    assert search_transactions.call_args.kwargs["min_round"] == 91
+
+    paid.refresh_from_db()
+    assert paid.status == TransactionStatus.SUCCESS
+    assert paid.txn_hash == "PAIDTXID"
+    assert Transaction.objects.get(uid=underpaid.uid).status == TransactionStatus.PENDING
+    assert Transaction.objects.get(uid=unpaid.uid).status == TransactionStatus.PENDING
+
+    # the recipient's revenue is incremented right away, leaving nothing to reconcile.
+    revenue = DailyRevenue.objects.get(account=account, asset=usdc_asa, network=Network.TESTNET)
+    assert revenue.date == timezone.now().date()
+    assert revenue.amount == 10
+    assert calculate_daily_revenue(Network.TESTNET) == 0
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize("is_account_opted_in", [True, False])
 @pytest.mark.parametrize("network", [Network.TESTNET, Network.MAINNET])
@@ -163,6 +247,321 @@ def test_revenue_calculator(
     assert usdt_revenue.count() == 1
     assert usdt_revenue.first().amount == 1000000  # type: ignore
 
-    assert choice_coin_revenue.exists()
-    assert choice_coin_revenue.count() == 1
-    assert choice_coin_revenue.first().amount == 0  # type: ignore
+    # no revenue was made with choice coin.
+    assert not choice_coin_revenue.exists()
+
+    # recalculating updates the day's rows in place.
+    Transaction.objects.create(
+        txn_reference="fp_hello_hii_hey",
+        txn_type="payment_link",
+        amount=50,
+        asset=algo_asa,
+        recipient=str(account.address),
+        status=TransactionStatus.SUCCESS,
+        sender=random_algorand_address,
+        network=network,
+    )
+    calculate_daily_revenue(network)
+    assert algo_revenue.count() == 1
+    assert algo_revenue.first().amount == 150  # type: ignore
+    assert usdc_revenue.first().amount == 10000  # type: ignore
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_revenue_calculator_query_count(
+    account: Account,
+    algo_asa: Asset,
+    usdc_asa: Asset,
+    random_algorand_address: str,
+    django_assert_max_num_queries: Any,
+) -> None:
+    for i in range(5):
+        Account.objects.create(address=generate_account()[1], is_verified=True)
+        for asset in (algo_asa, usdc_asa):
+            Transaction.objects.create(
+                txn_reference=f"fp_{UUID(int=i).hex}_{asset.asa_id:06}",
+                txn_type="normal",
+                amount=10,
+                asset=asset,
+                recipient=account.address,
+                status=TransactionStatus.SUCCESS,
+                sender=random_algorand_address,
+                network=Network.TESTNET,
+            )
+
+    # the daily revenues and the hourly, weekly and monthly rollups take a fixed number of
+    # queries each.
+    with django_assert_max_num_queries(16):
+        calculate_daily_revenue(Network.TESTNET)
+
+    revenues = DailyRevenue.objects.filter(network=Network.TESTNET)
+    assert revenues.count() == 2
+    assert {revenue.amount for revenue in revenues} == {50}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_revenue_calculator_removes_stale_revenues(
+    account: Account,
+    algo_asa: Asset,
+    usdc_asa: Asset,
+    random_algorand_address: str,
+) -> None:
+    transaction = Transaction.objects.create(
+        txn_reference=f"fp_{UUID(int=1).hex}_03ef72",
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender=random_algorand_address,
+        network=Network.TESTNET,
+    )
+    # counted twice, and counted although it's no longer successful.
+    assert mark_transaction_as_successful(transaction, "PAIDTXID")
+    Transaction.objects.filter(uid=transaction.uid).update(status=TransactionStatus.PENDING)
+    assert mark_transaction_as_successful(transaction, "PAIDTXID")
+    failed = Transaction.objects.create(
+        txn_reference=f"fp_{UUID(int=2).hex}_03ef72",
+        txn_type="normal",
+        amount=5,
+        asset=algo_asa,
+        recipient=account.address,
+        sender=random_algorand_address,
+        network=Network.TESTNET,
+    )
+    assert mark_transaction_as_successful(failed, "FAILEDTXID")
+    Transaction.objects.filter(uid=failed.uid).update(status=TransactionStatus.FAILED)
+
+    assert calculate_daily_revenue(Network.TESTNET) > 0
+
+    revenues = DailyRevenue.objects.filter(network=Network.TESTNET)
+    assert {revenue.asset_id: revenue.amount for revenue in revenues} == {usdc_asa.uid: 10}
+    rollups = RevenueRollup.objects.filter(network=Network.TESTNET)
+    assert {(rollup.asset_id, rollup.amount) for rollup in rollups} == {(usdc_asa.uid, 10)}
+    assert calculate_daily_revenue(Network.TESTNET) == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transactions_task_resumes_from_checked_round(
+    account: Account,
+    usdc_asa: Asset,
+) -> None:
+    transaction = Transaction.objects.create(
+        txn_reference=f"fp_{UUID(int=1).hex}_03ef72",
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+    )
+
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "search_transactions",
+        return_value={"current-round": 100, "transactions": []},
+    ) as search_transactions:
+        verify_transactions_task.call_local()
+
+        # the first sweep has no checked round to resume from, so it looks up the reference.
+        assert search_transactions.call_args.kwargs["min_round"] is None
+        assert search_transactions.call_args.kwargs["note_prefix"] == (
+            transaction.txn_reference.encode()
+        )
+        transaction.refresh_from_db()
+        assert transaction.checked_round == 100
+        assert transaction.attempts == 1
+        assert transaction.next_check_at is not None
+        assert transaction.next_check_at > timezone.now()
+
+        # transactions are only swept again once their next check is due.
+        search_transactions.reset_mock()
+        verify_transactions_task.call_local()
+        search_transactions.assert_not_called()
+
+        Transaction.objects.filter(uid=transaction.uid).update(next_check_at=timezone.now())
+        verify_transactions_task.call_local()
+        assert search_transactions.call_args.kwargs["min_round"] == 101
+        assert search_transactions.call_args.kwargs["address_role"] == "receiver"
+
+    # failed lookups leave the checked round of the transaction untouched.
+    Transaction.objects.filter(uid=transaction.uid).update(next_check_at=timezone.now())
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "search_transactions",
+        side_effect=IndexerHTTPError("Kaboom!"),
+    ):
+        verify_transactions_task.call_local()
+    transaction.refresh_from_db()
+    assert transaction.checked_round == 100
+    assert transaction.attempts == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transaction_task_follows_schedule(
+    account: Account,
+    usdc_asa: Asset,
+    django_capture_on_commit_callbacks: Any,
+) -> None:
+    sender = "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI"
+    transaction = Transaction.objects.create(
+        txn_reference=f"fp_{UUID(int=1).hex}_03ef72",
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender=sender,
+    )
+    onchain_txn = {
+        "id": "PAIDTXID",
+        "tx-type": "axfer",
+        "sender": sender,
+        "note": b64encode(transaction.txn_reference.encode()).decode(),
+        "asset-transfer-transaction": {
+            "receiver": account.address,
+            "amount": 10_000_000,
+            "asset-id": usdc_asa.asa_id,
+        },
+    }
+
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "search_transactions",
+        return_value={"current-round": 100, "transactions": []},
+    ) as search_transactions, mock.patch.object(verify_transaction_task, "schedule") as schedule:
+        with django_capture_on_commit_callbacks(execute=True):
+            verify_transaction_task.call_local(transaction.uid)
+
+        assert search_transactions.call_args.kwargs["min_round"] is None
+        transaction.refresh_from_db()
+        assert transaction.attempts == 1
+        assert transaction.checked_round == 100
+        schedule.assert_called_once_with(
+            (transaction.uid,), delay=VERIFICATION_SCHEDULE[1].total_seconds()
+        )
+
+        # the next attempt resumes from the round the transaction was checked up to.
+        search_transactions.return_value = {"current-round": 110, "transactions": [onchain_txn]}
+        with django_capture_on_commit_callbacks(execute=True):
+            verify_transaction_task.call_local(transaction.uid)
+        assert search_transactions.call_args.kwargs["min_round"] == 101
+
+    transaction.refresh_from_db()
+    assert transaction.status == TransactionStatus.SUCCESS
+    assert transaction.txn_hash == "PAIDTXID"
+    schedule.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_schedule_transaction_verification_hands_over_to_sweep(usdc_asa: Asset) -> None:
+    transaction = Transaction.objects.create(
+        txn_reference=f"fp_{UUID(int=1).hex}_03ef72",
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=generate_account()[1],
+        sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        attempts=len(VERIFICATION_SCHEDULE),
+    )
+
+    with mock.patch.object(verify_transaction_task, "schedule") as schedule:
+        schedule_transaction_verification(transaction)
+
+    schedule.assert_not_called()
+    transaction.refresh_from_db()
+    assert transaction.next_check_at is not None
+    assert transaction.next_check_at > timezone.now() + VERIFICATION_SCHEDULE[-2]
+
+
+@pytest.mark.django_db
+def test_verify_transactions_task_bounds_concurrent_lookups(
+    usdc_asa: Asset,
+    settings: SettingsWrapper,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    settings.TRANSACTIONS_VERIFICATION_MAX_WORKERS = {Network.TESTNET: 2, Network.MAINNET: 2}
+    for i in range(6):
+        Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=i).hex}_03ef72",
+            txn_type="normal",
+            amount=10,
+            asset=usdc_asa,
+            recipient=generate_account()[1],
+            sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        )
+
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = 0
+
+    def search_transactions(**kwargs: Any) -> dict:
+        nonlocal max_in_flight
+        with lock:
+            in_flight.append(kwargs["address"])
+            max_in_flight = max(max_in_flight, len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(kwargs["address"])
+        return {"current-round": 100, "transactions": []}
+
+    with caplog.at_level(logging.INFO, logger="flashpay.apps.payments.tasks"):
+        with mock.patch.object(
+            settings.TESTNET_INDEXER_CLIENT,
+            "search_transactions",
+            side_effect=search_transactions,
+        ) as mocked_search:
+            verify_transactions_task.call_local()
+
+    assert mocked_search.call_count == 6
+    assert max_in_flight == 2
+    assert "Ran 6 indexer lookup(s) on testnet" in caplog.text
+
+
+@pytest.mark.django_db
+def test_expire_pending_transactions(usdc_asa: Asset, settings: SettingsWrapper) -> None:
+    settings.PENDING_TRANSACTION_TTL = timedelta(hours=1)
+    abandoned, recent, paid = (
+        Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=i).hex}_03ef72",
+            txn_type="normal",
+            amount=10,
+            asset=usdc_asa,
+            recipient=generate_account()[1],
+            sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+            status=status,
+        )
+        for i, status in enumerate(
+            [TransactionStatus.PENDING, TransactionStatus.PENDING, TransactionStatus.SUCCESS]
+        )
+    )
+    Transaction.objects.filter(uid__in=[abandoned.uid, paid.uid]).update(
+        created_at=timezone.now() - timedelta(hours=2)
+    )
+
+    assert expire_pending_transactions() == 1
+
+    assert Transaction.objects.get(uid=abandoned.uid).status == TransactionStatus.EXPIRED
+    assert Transaction.objects.get(uid=recent.uid).status == TransactionStatus.PENDING
+    assert Transaction.objects.get(uid=paid.uid).status == TransactionStatus.SUCCESS
+
+    # recently expired transactions are still verified, as a late payment completes them.
+    with mock.patch.object(settings.TESTNET_INDEXER_CLIENT, "search_transactions") as search:
+        search.return_value = {"current-round": 100, "transactions": []}
+        verify_transactions_task.call_local()
+    assert sorted(call.kwargs["note_prefix"] for call in search.call_args_list) == sorted(
+        [recent.txn_reference.encode(), abandoned.txn_reference.encode()]
+    )
+    assert mark_transaction_as_successful(abandoned, "LATETXID")
+    assert Transaction.objects.get(uid=abandoned.uid).status == TransactionStatus.SUCCESS
+
+    # until the grace period is over.
+    Transaction.objects.filter(uid=abandoned.uid).update(status=TransactionStatus.EXPIRED)
+    Transaction.objects.update(next_check_at=None)
+    settings.EXPIRED_TRANSACTION_GRACE_PERIOD = timedelta(minutes=30)
+    with mock.patch.object(settings.TESTNET_INDEXER_CLIENT, "search_transactions") as search:
+        search.return_value = {"current-round": 100, "transactions": []}
+        verify_transactions_task.call_local()
+    assert [call.kwargs["address"] for call in search.call_args_list] == [recent.recipient]
+    assert not mark_transaction_as_successful(abandoned, "LATETXID")
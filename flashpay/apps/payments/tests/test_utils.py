@@ -0,0 +1,107 @@
+from unittest import mock
+
+import pytest
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from flashpay.apps.account.models import Account
+from flashpay.apps.core.models import Asset, Network
+from flashpay.apps.payments.models import PaymentLink, Transaction, TransactionStatus
+from flashpay.apps.payments.utils import (
+    check_if_address_opted_in_asa,
+    generate_txn_reference,
+    mark_transaction_as_successful,
+    recalculate_payment_link_counters,
+)
+
+
+def test_check_if_address_opted_in_asa_is_cached(random_algorand_address: str) -> None:
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT,
+        "account_info",
+        return_value={"assets": [{"asset-id": 10, "amount": 0}]},
+    ) as account_info:
+        for _ in range(3):
+            assert check_if_address_opted_in_asa(random_algorand_address, 10, Network.TESTNET)
+        account_info.assert_called_once()
+
+        # ALGO needs no opt in.
+        assert check_if_address_opted_in_asa(random_algorand_address, 0, Network.TESTNET)
+        account_info.assert_called_once()
+
+        # an unknown ASA refreshes the cached opt ins before failing.
+        assert not check_if_address_opted_in_asa(random_algorand_address, 20, Network.TESTNET)
+        assert account_info.call_count == 2
+        # which is remembered for a while.
+        assert not check_if_address_opted_in_asa(random_algorand_address, 20, Network.TESTNET)
+        assert account_info.call_count == 2
+
+        cache.clear()
+        account_info.return_value = {"assets": [{"asset-id": 10}, {"asset-id": 20}]}
+        assert check_if_address_opted_in_asa(random_algorand_address, 20, Network.TESTNET)
+        assert account_info.call_count == 3
+        assert check_if_address_opted_in_asa(random_algorand_address, 20, Network.TESTNET)
+        assert account_info.call_count == 3
+
+        # a cold cache is read once, even when the address isn't opted in.
+        cache.clear()
+        assert not check_if_address_opted_in_asa(random_algorand_address, 30, Network.TESTNET)
+        assert account_info.call_count == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_mark_transaction_as_successful_updates_payment_link(
+    account: Account, usdc_asa: Asset
+) -> None:
+    payment_link = PaymentLink.objects.create(
+        name="Test Link",
+        asset=usdc_asa,
+        amount=10,
+        account=account,
+        is_one_time=True,
+        network=Network.TESTNET,
+    )
+    db_txn = Transaction.objects.create(
+        txn_reference=generate_txn_reference(payment_link.uid),
+        txn_type="payment_link",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        payment_link=payment_link,
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        assert mark_transaction_as_successful(db_txn, "txid")
+    # the link fetched along with the transaction is updated without being read again.
+    assert not [
+        query
+        for query in queries
+        if query["sql"].startswith("SELECT") and "payments_paymentlink" in query["sql"]
+    ]
+    # a transaction is only counted once.
+    assert not mark_transaction_as_successful(db_txn, "txid")
+
+    payment_link.refresh_from_db()
+    assert payment_link.total_revenue == 10
+    assert payment_link.successful_payment_count == 1
+    assert payment_link.last_paid_at == db_txn.updated_at
+    assert payment_link.is_active is False
+
+    PaymentLink.objects.update(total_revenue=0, successful_payment_count=0, last_paid_at=None)
+    assert recalculate_payment_link_counters() == 1
+    payment_link.refresh_from_db()
+    assert payment_link.total_revenue == 10
+    assert payment_link.successful_payment_count == 1
+    assert payment_link.last_paid_at == db_txn.updated_at
+    assert recalculate_payment_link_counters() == 0
+
+    Transaction.objects.filter(uid=db_txn.uid).update(status=TransactionStatus.FAILED)
+    assert recalculate_payment_link_counters() == 1
+    payment_link.refresh_from_db()
+    assert payment_link.total_revenue == 0
+    assert payment_link.last_paid_at is None
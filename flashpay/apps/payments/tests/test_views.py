@@ -1,15 +1,39 @@
+from base64 import b64encode
+from decimal import Decimal
+from typing import Any, List
+from unittest import mock
 from uuid import UUID
 
 import pytest
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import SuggestedParams
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 
 from flashpay.apps.account.models import Account, APIKey
 from flashpay.apps.core.models import Asset
-from flashpay.apps.payments.models import Network, PaymentLink, Transaction, TransactionStatus
+from flashpay.apps.payments.constants import RECENT_TRANSACTIONS_LIMIT
+from flashpay.apps.payments.models import (
+    DailyRevenue,
+    Network,
+    PaymentLink,
+    Transaction,
+    TransactionStatus,
+)
 from flashpay.apps.payments.tasks import calculate_daily_revenue
+from flashpay.apps.payments.utils import (
+    generate_txn_reference,
+    mark_transaction_as_successful,
+    to_indexer_transaction,
+    verify_transaction,
+)
 
 
 @pytest.mark.django_db
@@ -336,6 +360,10 @@ def test_initialize_transaction(
     # check that the created link is present in db
     transaction = Transaction.objects.first()
     assert transaction is not None
+    # its first verification attempt is scheduled.
+    assert transaction.attempts == 0
+    assert transaction.next_check_at is not None
+    assert transaction.payment_link == payment_link
 
     # Fetch all transactions Endpoint
     response = secret_key_api_client.get("/api/transactions")
@@ -458,6 +486,160 @@ def test_verify_transaction_algo(
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transaction_by_txid(
+    secret_key_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+) -> None:
+    sender = "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI"
+    tx_ref = f"fp_{UUID(int=1).hex}_03ef72"
+    transaction = Transaction.objects.create(
+        txn_reference=tx_ref,
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender=sender,
+    )
+    pending_txn = {
+        "confirmed-round": 0,
+        "pool-error": "",
+        "txn": {
+            "sig": "",
+            "txn": {
+                "type": "axfer",
+                "snd": sender,
+                "arcv": account.address,
+                "aamt": 10_000_000,
+                "xaid": usdc_asa.asa_id,
+                "note": b64encode(tx_ref.encode()).decode(),
+            },
+        },
+    }
+
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT, "pending_transaction_info", return_value=pending_txn
+    ) as pending_transaction_info, mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT, "search_transactions"
+    ) as search:
+        # still in the pending pool.
+        response = secret_key_api_client.post(
+            f"/api/transactions/verify/{tx_ref}", data={"txid": "PAIDTXID"}
+        )
+        assert response.status_code == 202
+        assert response.data["data"]["status"] == TransactionStatus.PENDING
+
+        # polls right after reuse the result.
+        response = secret_key_api_client.post(
+            f"/api/transactions/verify/{tx_ref}", data={"txid": "PAIDTXID"}
+        )
+        assert response.status_code == 202
+        pending_transaction_info.assert_called_once()
+
+        cache.clear()
+        pending_txn["confirmed-round"] = 100
+        response = secret_key_api_client.post(
+            f"/api/transactions/verify/{tx_ref}", data={"txid": "PAIDTXID"}
+        )
+        assert response.status_code == 200
+
+    search.assert_not_called()
+    transaction.refresh_from_db()
+    assert transaction.status == TransactionStatus.SUCCESS
+    assert transaction.txn_hash == "PAIDTXID"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transaction_by_txid_falls_back_to_reference(
+    secret_key_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+) -> None:
+    sender = "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI"
+    tx_ref = f"fp_{UUID(int=1).hex}_03ef72"
+    Transaction.objects.create(
+        txn_reference=tx_ref,
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender=sender,
+    )
+    onchain_txn = {
+        "id": "PAIDTXID",
+        "confirmed-round": 100,
+        "tx-type": "axfer",
+        "sender": sender,
+        "note": b64encode(f"fp_{UUID(int=2).hex}_03ef72".encode()).decode(),
+        "asset-transfer-transaction": {
+            "receiver": account.address,
+            "amount": 10_000_000,
+            "asset-id": usdc_asa.asa_id,
+        },
+    }
+
+    # unknown to algod, found on the indexer but made for another reference.
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT,
+        "pending_transaction_info",
+        side_effect=AlgodHTTPError("txn does not exist", code=404),
+    ), mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "transaction",
+        return_value={"current-round": 100, "transaction": onchain_txn},
+    ), mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT,
+        "search_transactions",
+        return_value={"current-round": 100, "transactions": []},
+    ) as search:
+        response = secret_key_api_client.post(
+            f"/api/transactions/verify/{tx_ref}", data={"txid": "PAIDTXID"}
+        )
+
+    search.assert_called_once()
+    assert response.status_code == 400
+    assert response.data["data"]["status"] == TransactionStatus.FAILED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_verify_transaction_keeps_a_concurrent_success(
+    secret_key_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+) -> None:
+    tx_ref = f"fp_{UUID(int=1).hex}_03ef72"
+    transaction = Transaction.objects.create(
+        txn_reference=tx_ref,
+        txn_type="normal",
+        amount=10,
+        asset=usdc_asa,
+        recipient=account.address,
+        sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+    )
+
+    def search_transactions(**kwargs: Any) -> dict:
+        # another verifier completes the transaction while this one is looking it up.
+        Transaction.objects.filter(uid=transaction.uid).update(
+            status=TransactionStatus.SUCCESS, txn_hash="PAIDTXID"
+        )
+        return {"current-round": 100, "transactions": []}
+
+    with mock.patch.object(
+        settings.TESTNET_INDEXER_CLIENT, "search_transactions", side_effect=search_transactions
+    ):
+        response = secret_key_api_client.post(f"/api/transactions/verify/{tx_ref}")
+
+    assert response.status_code == 200
+    assert response.data["data"]["status"] == TransactionStatus.SUCCESS
+    transaction.refresh_from_db()
+    assert transaction.status == TransactionStatus.SUCCESS
+    assert transaction.txn_hash == "PAIDTXID"
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize("is_account_opted_in", [True])
 def test_verify_transaction_with_wrong_txn_hash_and_txn_note(
@@ -527,3 +709,557 @@ def test_daily_revenue(
     assert len(response.data["data"]) == 1
     assert response.data["data"][0]["asa_id"] == usdc_asa.asa_id
     assert response.data["data"][0]["amount"] == "100.0000"
+
+    for date_range in ["30d", "6m", "year"]:
+        response = jwt_api_client.get(
+            f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&date_range={date_range}"
+        )
+        assert response.status_code == 200
+        assert len(response.data["data"]) == 1
+
+    # with the auto granularity, the coarsest table suiting the date range is read.
+    for date_range, field in [("30d", "created_at"), ("6m", "period_start"), ("", "period_start")]:
+        response = jwt_api_client.get(
+            f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&date_range={date_range}"
+            "&granularity=auto"
+        )
+        assert response.status_code == 200
+        assert len(response.data["data"]) == 1
+        assert field in response.data["data"][0]
+
+    # coarser granularities are read from the rollups.
+    for granularity in ["hour", "week", "month"]:
+        response = jwt_api_client.get(
+            f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&granularity={granularity}"
+            "&date_range=year"
+        )
+        assert response.status_code == 200
+        assert len(response.data["data"]) == 1
+        assert response.data["data"][0]["amount"] == "100.0000"
+        assert "period_start" in response.data["data"][0]
+
+    response = jwt_api_client.get(
+        f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&granularity=decade"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_daily_revenue_is_dated_by_its_day(
+    jwt_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+) -> None:
+    # e.g computed by a backfill today.
+    day = timezone.now().date() - timezone.timedelta(days=3)
+    DailyRevenue.objects.create(
+        account=account, asset=usdc_asa, network=Network.TESTNET, date=day, amount=100
+    )
+
+    response = jwt_api_client.get(f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&date_range=30d")
+    assert response.status_code == 200
+    assert response.data["data"][0]["date"] == day.isoformat()
+    assert response.data["data"][0]["created_at"].startswith(day.isoformat())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_daily_revenue_columnar(
+    jwt_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+    network: Network,
+) -> None:
+    today = timezone.now().date()
+    for days_ago, amount in [(3, 50), (1, 20)]:
+        DailyRevenue.objects.create(
+            account=account,
+            asset=usdc_asa,
+            network=network,
+            date=today - timezone.timedelta(days=days_ago),
+            amount=amount,
+        )
+
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_api_client.get(
+            f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&format=columnar"
+        )
+    assert response.status_code == 200
+    # the series is read with a single query, besides authenticating the request.
+    assert len([query for query in queries if "dailyrevenue" in query["sql"]]) == 1
+    assert response.data["data"] == {
+        "asa_id": usdc_asa.asa_id,
+        "dates": [(today - timezone.timedelta(days=i)).isoformat() for i in range(3, -1, -1)],
+        "amounts": ["50.0000", "0.0000", "20.0000", "0.0000"],
+    }
+
+    # gaps are filled from the start of the range.
+    response = jwt_api_client.get(
+        f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&format=columnar&date_range=30d"
+    )
+    assert response.status_code == 200
+    assert len(response.data["data"]["dates"]) == 31
+    assert len(response.data["data"]["amounts"]) == 31
+    assert response.data["data"]["amounts"][-4] == "50.0000"
+
+    response = jwt_api_client.get(
+        f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&format=columnar&granularity=month"
+    )
+    assert response.status_code == 200
+    assert response.data["data"]["dates"] == []
+
+    # series too long to fill are refused.
+    response = jwt_api_client.get(
+        f"/api/daily-revenue?asa_id={usdc_asa.asa_id}&format=columnar&granularity=hour"
+        "&date_range=6m"
+    )
+    assert response.status_code == 400
+
+    response = jwt_api_client.get("/api/daily-revenue?asa_id=usdc&format=columnar")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_revenue_summary(
+    jwt_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    usdc_asa: Asset,
+    network: Network,
+) -> None:
+    for i, (asset, txn_status) in enumerate(
+        [
+            (usdc_asa, TransactionStatus.SUCCESS),
+            (usdc_asa, TransactionStatus.SUCCESS),
+            (usdc_asa, TransactionStatus.FAILED),
+            (usdc_asa, TransactionStatus.PENDING),
+            (algo_asa, TransactionStatus.SUCCESS),
+        ]
+    ):
+        Transaction.objects.create(
+            txn_reference=f"fp_{UUID(int=i).hex}_03ef72",
+            txn_type="normal",
+            amount=10,
+            asset=asset,
+            recipient=account.address,
+            status=txn_status,
+            network=network,
+            sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        )
+    calculate_daily_revenue(network)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_api_client.get("/api/revenue-summary?date_range=30d")
+    assert response.status_code == 200
+    assert len([query for query in queries if "payments_" in query["sql"]]) == 2
+    algo_summary, usdc_summary = response.data["data"]["assets"]
+    assert algo_summary["asa_id"] == algo_asa.asa_id
+    assert algo_summary["total_revenue"] == "10.0000"
+    assert algo_summary["success_ratio"] == 1
+    assert usdc_summary["asa_id"] == usdc_asa.asa_id
+    assert usdc_summary["total_revenue"] == "20.0000"
+    assert len(usdc_summary["dates"]) == len(usdc_summary["amounts"]) == 31
+    assert usdc_summary["amounts"][-1] == "20.0000"
+    assert usdc_summary["transactions"] == {
+        "total": 4,
+        "pending": 1,
+        "success": 2,
+        "failed": 1,
+        "expired": 0,
+    }
+    assert usdc_summary["success_ratio"] == 0.5
+    assert usdc_summary["failure_ratio"] == 0.25
+
+    # the summary is cached per account.
+    Transaction.objects.filter(asset=usdc_asa).delete()
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_api_client.get("/api/revenue-summary?date_range=30d")
+    assert not [query for query in queries if "payments_" in query["sql"]]
+    assert response.data["data"]["assets"][1]["transactions"]["total"] == 4
+
+
+@pytest.mark.django_db
+def test_payment_link_transactions(
+    secret_key_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    network: Network,
+) -> None:
+    payment_links = [
+        PaymentLink.objects.create(
+            name=f"Test Link {i}", asset=algo_asa, amount=10, account=account, network=network
+        )
+        for i in range(2)
+    ]
+    for i in range(RECENT_TRANSACTIONS_LIMIT + 2):
+        for payment_link in payment_links[: 1 if i else 2]:
+            Transaction.objects.create(
+                txn_reference=generate_txn_reference(payment_link.uid),
+                txn_type="payment_link",
+                amount=i + 1,
+                asset=algo_asa,
+                recipient=account.address,
+                sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+                network=network,
+                payment_link=payment_link,
+            )
+
+    # the latest transactions of every link are fetched at once.
+    with CaptureQueriesContext(connection) as queries:
+        response = secret_key_api_client.get("/api/payment-links")
+    assert response.status_code == 200
+    assert len([query for query in queries if "payments_transaction" in query["sql"]]) == 1
+    busy_link, quiet_link = sorted(
+        response.data["data"]["results"], key=lambda link: -len(link["transactions"])
+    )
+    assert [txn["amount"] for txn in busy_link["transactions"]] == [
+        f"{amount}.0000" for amount in range(RECENT_TRANSACTIONS_LIMIT + 2, 2, -1)
+    ]
+    assert [txn["amount"] for txn in quiet_link["transactions"]] == ["1.0000"]
+
+    response = secret_key_api_client.get(f"/api/payment-links/{payment_links[0].slug}")
+    assert response.status_code == 200
+    assert len(response.data["data"]["transactions"]) == RECENT_TRANSACTIONS_LIMIT
+
+    # the whole history is paginated with cursors.
+    amounts: List[str] = []
+    url = f"/api/payment-links/{payment_links[0].slug}/transactions"
+    while url:
+        response = secret_key_api_client.get(url)
+        assert response.status_code == 200
+        assert "Transactions returned successfully" in response.data["message"]
+        amounts.extend(txn["amount"] for txn in response.data["data"]["results"])
+        url = response.data["data"]["next"]
+    assert amounts == [f"{amount}.0000" for amount in range(RECENT_TRANSACTIONS_LIMIT + 2, 0, -1)]
+
+    response = secret_key_api_client.get("/api/payment-links/unknown/transactions")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_payment_link_list_query_count(
+    secret_key_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    network: Network,
+) -> None:
+    def list_payment_links(count: int) -> int:
+        while PaymentLink.objects.count() < count:
+            payment_link = PaymentLink.objects.create(
+                name="Test Link", asset=algo_asa, amount=10, account=account, network=network
+            )
+            Transaction.objects.create(
+                txn_reference=generate_txn_reference(payment_link.uid),
+                txn_type="payment_link",
+                amount=10,
+                asset=algo_asa,
+                recipient=account.address,
+                sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+                network=network,
+                payment_link=payment_link,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = secret_key_api_client.get("/api/payment-links")
+        assert response.status_code == 200
+        assert len(response.data["data"]["results"]) == count
+        return len(queries)
+
+    # links, their accounts and assets, and their transactions are fetched in a fixed number
+    # of queries however many links are on the page.
+    assert list_payment_links(1) == list_payment_links(5)
+
+
+@pytest.mark.django_db
+def test_anonymous_payment_link_is_cached(
+    jwt_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    network: Network,
+    django_capture_on_commit_callbacks: Any,
+) -> None:
+    payer_client = APIClient()
+    payment_link = PaymentLink.objects.create(
+        name="Test Link", asset=algo_asa, amount=10, account=account, network=network
+    )
+    url = f"/api/payment-links/{payment_link.slug}"
+
+    def get_payment_link(queries_expected: bool) -> Any:
+        with CaptureQueriesContext(connection) as queries:
+            response = payer_client.get(url)
+        assert bool(queries) is queries_expected
+        return response
+
+    response = get_payment_link(queries_expected=True)
+    assert response.status_code == 200
+    assert response.data["data"]["public_key"]
+    assert get_payment_link(queries_expected=False).data == response.data
+
+    # unknown slugs are cached too.
+    for queries_expected in (True, False):
+        with CaptureQueriesContext(connection) as queries:
+            response = payer_client.get("/api/payment-links/unknown")
+        assert response.status_code == 404
+        assert bool(queries) is queries_expected
+
+    # updating the link invalidates it.
+    response = jwt_api_client.patch(url)
+    assert response.status_code == 200
+    assert get_payment_link(queries_expected=True).data["data"]["is_active"] is False
+
+    # so does paying it.
+    db_txn = Transaction.objects.create(
+        txn_reference=generate_txn_reference(payment_link.uid),
+        txn_type="payment_link",
+        amount=10,
+        asset=algo_asa,
+        recipient=account.address,
+        sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        network=network,
+        payment_link=payment_link,
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        mark_transaction_as_successful(db_txn, "txid")
+    assert get_payment_link(queries_expected=True).data["data"]["total_revenue"] == "10.0000"
+
+    # and rotating the API key shown with it.
+    public_key = get_payment_link(queries_expected=False).data["data"]["public_key"]
+    response = jwt_api_client.post("/api/accounts/api-keys")
+    assert response.status_code == 201
+    assert get_payment_link(queries_expected=True).data["data"]["public_key"] != public_key
+
+
+@pytest.mark.django_db
+def test_payment_link_checkout(
+    secret_key_api_client: APIClient,
+    account: Account,
+    usdc_asa: Asset,
+    network: Network,
+) -> None:
+    payer_client = APIClient()
+    payment_link = PaymentLink.objects.create(
+        name="Test Link", asset=usdc_asa, amount=10, account=account, network=network
+    )
+    suggested_params = SuggestedParams(
+        fee=1000, first=10, last=1010, gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI="
+    )
+
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT, "suggested_params", return_value=suggested_params
+    ) as get_suggested_params, mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT,
+        "account_info",
+        return_value={"assets": [{"asset-id": usdc_asa.asa_id}]},
+    ):
+        responses = [
+            payer_client.get(f"/api/payment-links/{payment_link.slug}/checkout") for _ in range(2)
+        ]
+    # suggested params are shared by every checkout for a few seconds.
+    get_suggested_params.assert_called_once()
+
+    for response in responses:
+        assert response.status_code == 200
+        data = response.data["data"]
+        assert data["payment_link"]["slug"] == payment_link.slug
+        assert data["payment_link"]["asset"]["asa_id"] == usdc_asa.asa_id
+        assert data["payment_link"]["public_key"]
+        assert data["recipient_opted_in"] is True
+        assert data["suggested_params"]["first"] == 10
+        assert data["suggested_params"]["gh"] == suggested_params.gh
+    # every payer gets their own reference.
+    assert responses[0].data["data"]["txn_reference"] != responses[1].data["data"]["txn_reference"]
+
+    # the reference is used to create the transaction.
+    txn_reference = responses[0].data["data"]["txn_reference"]
+    data = {
+        "amount": 10,
+        "asset": usdc_asa.asa_id,
+        "payment_link": payment_link.uid,
+        "txn_type": "payment_link",
+        "recipient": account.address,
+        "sender": "XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+        "txn_reference": txn_reference,
+    }
+    with mock.patch(
+        "flashpay.apps.payments.serializers.check_if_address_opted_in_asa", return_value=True
+    ):
+        response = secret_key_api_client.post("/api/transactions", data=data)
+        assert response.status_code == 201
+        assert response.data["data"]["txn_reference"] == txn_reference
+
+        # it can't be reused, nor belong to another payment link.
+        response = secret_key_api_client.post("/api/transactions", data=data)
+        assert response.status_code == 400
+        data["txn_reference"] = generate_txn_reference()
+        response = secret_key_api_client.post("/api/transactions", data=data)
+        assert response.status_code == 400
+        assert "txn_reference" in response.data["data"]
+
+    # algod being down doesn't fail the checkout.
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT, "suggested_params", side_effect=AlgodHTTPError("down", 500)
+    ):
+        cache.clear()
+        response = payer_client.get(f"/api/payment-links/{payment_link.slug}/checkout")
+    assert response.status_code == 200
+    assert response.data["data"]["suggested_params"] is None
+
+    # links that can't be paid hand out no reference.
+    PaymentLink.objects.filter(uid=payment_link.uid).update(is_active=False)
+    cache.clear()
+    response = payer_client.get(f"/api/payment-links/{payment_link.slug}/checkout")
+    assert response.status_code == 400
+    assert response.data["data"] is None
+
+    response = payer_client.get("/api/payment-links/unknown/checkout")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_account_opted_in", [True])
+def test_unsigned_transaction(
+    public_key_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    usdc_asa: Asset,
+    network: Network,
+) -> None:
+    suggested_params = SuggestedParams(
+        fee=1000,
+        first=10,
+        last=1010,
+        gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=",
+        flat_fee=True,
+    )
+    db_txns = [
+        Transaction.objects.create(
+            txn_reference=generate_txn_reference(),
+            txn_type="normal",
+            amount=Decimal("2.5"),
+            asset=asset,
+            recipient=account.address,
+            sender="XQ52337XYJMFNUM73IC5KSLG6UXYKMK3H36LW6RI2DRBSGIJRQBI6X6OYI",
+            network=network,
+        )
+        for asset in (algo_asa, usdc_asa)
+    ]
+
+    with mock.patch.object(
+        settings.TESTNET_ALGOD_CLIENT, "suggested_params", return_value=suggested_params
+    ) as get_suggested_params:
+        for db_txn in db_txns:
+            response = public_key_api_client.get(
+                f"/api/transactions/unsigned/{db_txn.txn_reference}"
+            )
+            assert response.status_code == 200
+            onchain_txn = encoding.msgpack_decode(response.data["data"]["txn"])
+            assert onchain_txn.get_txid() == response.data["data"]["txid"]
+            assert onchain_txn.note == db_txn.txn_reference.encode()
+            assert onchain_txn.first_valid_round == 10
+            assert onchain_txn.fee == 1000
+            # the transaction built is the one expected when verifying it.
+            assert verify_transaction(
+                db_txn, to_indexer_transaction(onchain_txn.dictify(), onchain_txn.get_txid())
+            )
+    get_suggested_params.assert_called_once()
+
+    Transaction.objects.filter(uid=db_txns[0].uid).update(status=TransactionStatus.SUCCESS)
+    response = public_key_api_client.get(f"/api/transactions/unsigned/{db_txns[0].txn_reference}")
+    assert response.status_code == 409
+
+    response = public_key_api_client.get(f"/api/transactions/unsigned/{generate_txn_reference()}")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_list_transactions_sent_and_received(
+    jwt_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    network: Network,
+    random_algorand_address: str,
+) -> None:
+    other_network = Network.MAINNET if network == Network.TESTNET else Network.TESTNET
+    for i, (sender, recipient, txn_network) in enumerate(
+        [
+            (random_algorand_address, account.address, network),
+            (account.address, random_algorand_address, network),
+            (random_algorand_address, account.address, other_network),
+            (random_algorand_address, random_algorand_address, network),
+            (random_algorand_address, account.address, network),
+        ]
+    ):
+        Transaction.objects.create(
+            txn_reference=generate_txn_reference(),
+            txn_type="normal",
+            amount=i + 1,
+            asset=algo_asa,
+            recipient=recipient,
+            sender=sender,
+            network=txn_network,
+        )
+
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_api_client.get("/api/transactions")
+    assert response.status_code == 200
+    assert response.data["data"]["count"] == 3
+    # the latest transactions received or sent come first.
+    assert [txn["amount"] for txn in response.data["data"]["results"]] == [
+        "5.0000",
+        "2.0000",
+        "1.0000",
+    ]
+    assert response.data["data"]["results"][0]["asset"]["asa_id"] == algo_asa.asa_id
+    assert any("UNION ALL" in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+def test_list_transactions_keyset_pagination(
+    jwt_api_client: APIClient,
+    account: Account,
+    algo_asa: Asset,
+    network: Network,
+    random_algorand_address: str,
+) -> None:
+    created_at = timezone.now()
+    for i in range(7):
+        txn = Transaction.objects.create(
+            txn_reference=generate_txn_reference(),
+            txn_type="normal",
+            amount=i + 1,
+            asset=algo_asa,
+            recipient=account.address if i % 2 else random_algorand_address,
+            sender=random_algorand_address if i % 2 else account.address,
+            network=network,
+        )
+        # ties on `created_at` are broken by `uid`.
+        Transaction.objects.filter(pk=txn.pk).update(
+            created_at=created_at - timezone.timedelta(minutes=i // 2)
+        )
+    expected = list(
+        Transaction.objects.order_by("-created_at", "-uid").values_list("amount", flat=True)
+    )
+
+    response = jwt_api_client.get("/api/transactions?pagination=keyset")
+    assert response.status_code == 200
+    first_page = response.data["data"]
+    assert first_page["count"] is None
+    assert first_page["previous"] is None
+    assert [Decimal(txn["amount"]) for txn in first_page["results"]] == expected[:5]
+
+    response = jwt_api_client.get(first_page["next"])
+    second_page = response.data["data"]
+    assert [Decimal(txn["amount"]) for txn in second_page["results"]] == expected[5:]
+    assert second_page["next"] is None
+
+    response = jwt_api_client.get(second_page["previous"])
+    assert response.data["data"]["results"] == first_page["results"]
+    assert response.data["data"]["previous"] is None
+
+    response = jwt_api_client.get("/api/transactions?cursor=invalid")
+    assert response.status_code == 404
+
+    # page number pagination stays the default.
+    response = jwt_api_client.get("/api/transactions")
+    assert response.data["data"]["count"] == 7
@@ -1,8 +1,15 @@
 from django.urls import path
 
-from flashpay.apps.payments.views import PaymentLinkDetailView, PaymentLinkView
+from flashpay.apps.payments.views import (
+    PaymentLinkCheckoutView,
+    PaymentLinkDetailView,
+    PaymentLinkTransactionsView,
+    PaymentLinkView,
+)
 
 urlpatterns = [
     path("", PaymentLinkView.as_view()),
     path("/<str:slug>", PaymentLinkDetailView.as_view()),
+    path("/<str:slug>/checkout", PaymentLinkCheckoutView.as_view()),
+    path("/<str:slug>/transactions", PaymentLinkTransactionsView.as_view()),
 ]
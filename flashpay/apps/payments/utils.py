@@ -1,11 +1,55 @@
+import binascii
 import secrets
-from typing import Optional
+from base64 import b32encode, b64decode, b64encode
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Type, TypeVar, Union
 from uuid import UUID, uuid4
 
+from algosdk import constants as algosdk_constants, encoding
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
+from algosdk.future.transaction import AssetTransferTxn, PaymentTxn, SuggestedParams
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.db.transaction import atomic, on_commit
+from django.utils import timezone
+
+from flashpay.apps.account.models import Account
+from flashpay.apps.core.cache import clear_single_flight
+from flashpay.apps.core.clients import get_algod_client
+from flashpay.apps.core.models import Asset, Network
+from flashpay.apps.payments.constants import (
+    INDEXER_PAGE_LIMIT,
+    NOT_OPTED_IN_ASA_TIMEOUT,
+    OPTED_IN_ASA_IDS_TIMEOUT,
+    PAYMENT_LINK_COUNTERS_BATCH_SIZE,
+    RECENT_TRANSACTIONS_LIMIT,
+    TXN_REFERENCE_LENGTH,
+    ZERO_AMOUNT,
+)
+from flashpay.apps.payments.models import (
+    DailyRevenue,
+    PaymentLink,
+    RevenueGranularity,
+    RevenueRollup,
+    Transaction,
+    TransactionStatus,
+)
+
+RevenueModel = TypeVar("RevenueModel", DailyRevenue, RevenueRollup)
+
+
+def get_payment_link_cache_key(slug: str) -> str:
+    """Returns the key the payload of a payment link shown to payers is cached under."""
+    return f"payment-link:{slug}"
+
 
-from flashpay.apps.core.models import Network
-from flashpay.apps.payments.models import Transaction
+def invalidate_payment_link_cache(*slugs: str) -> None:
+    clear_single_flight(*(get_payment_link_cache_key(slug) for slug in slugs))
 
 
 def generate_txn_reference(uid: Optional[UUID] = None) -> str:
@@ -17,20 +61,41 @@ def generate_txn_reference(uid: Optional[UUID] = None) -> str:
     return f"fp_{uid.hex}_{secrets.token_hex(3)}"
 
 
+def get_opted_in_asa_ids_cache_key(address: str, network: Network) -> str:
+    return f"opted-in-asa-ids:{network}:{address}"
+
+
+def get_opted_in_asa_ids(address: str, network: Network, refresh: bool = False) -> Set[int]:
+    """Returns the ids of the ASAs an address is opted into, cached for
+    `OPTED_IN_ASA_IDS_TIMEOUT` seconds unless `refresh` is set.
+    """
+    key = get_opted_in_asa_ids_cache_key(address, network)
+    asa_ids: Optional[Set[int]] = None if refresh else cache.get(key)
+    if asa_ids is None:
+        # the raw client is used as this is cached here.
+        account_info = get_algod_client(network).client.account_info(address)
+        asa_ids = {asset["asset-id"] for asset in account_info.get("assets", [])}
+        cache.set(key, asa_ids, timeout=OPTED_IN_ASA_IDS_TIMEOUT)
+    return asa_ids
+
+
 def check_if_address_opted_in_asa(address: str, asset_id: int, network: Network) -> bool:
     """Checks if the provided address is opted into a given ASA."""
-    algod_client = (
-        settings.TESTNET_ALGOD_CLIENT
-        if network == Network.TESTNET
-        else settings.MAINNET_ALGOD_CLIENT
-    )
     # asset_id = 0  || 1 is used for Algorand native token.
     if asset_id == 0 or asset_id == 1:
         return True
-    account_info = algod_client.account_info(address)
-    for asset in account_info["assets"]:
-        if asset_id == asset["asset-id"]:
-            return True
+    key = get_opted_in_asa_ids_cache_key(address, network)
+    not_opted_in_key = f"{key}:not-opted-in:{asset_id}"
+    cached = cache.get_many([key, not_opted_in_key])
+    if asset_id in cached.get(key, set()):
+        return True
+    if not_opted_in_key in cached:
+        return False
+    # a cache hit may be stale, as the address may have opted in since its ASAs were cached.
+    asa_ids = get_opted_in_asa_ids(address, network, refresh=key in cached)
+    if asset_id in asa_ids:
+        return True
+    cache.set(not_opted_in_key, True, timeout=NOT_OPTED_IN_ASA_TIMEOUT)
     return False
 
 
@@ -57,3 +122,366 @@ def verify_transaction(db_txn: Transaction, onchain_txn: dict) -> bool:
     ):
         return True
     return False
+
+
+def build_unsigned_transaction(  # type: ignore[no-any-unimported]
+    db_txn: Transaction, suggested_params: SuggestedParams
+) -> Union[PaymentTxn, AssetTransferTxn]:
+    """Builds the onchain transaction paying a pending transaction, i.e that
+    `verify_transaction` accepts, for its sender to sign.
+
+    May raise:
+    - ValueError, if the amount is more precise than the asset's decimals.
+    """
+    base_units = db_txn.amount * 10**db_txn.asset.decimals
+    if base_units != base_units.to_integral_value():
+        raise ValueError(f"{db_txn.amount} has more than {db_txn.asset.decimals} decimals")
+    note = db_txn.txn_reference.encode()
+    # asset_id = 0  || 1 is used for Algorand native token.
+    if db_txn.asset.asa_id in (0, 1):
+        return PaymentTxn(
+            db_txn.sender, suggested_params, db_txn.recipient, int(base_units), note=note
+        )
+    return AssetTransferTxn(
+        db_txn.sender,
+        suggested_params,
+        db_txn.recipient,
+        int(base_units),
+        db_txn.asset.asa_id,
+        note=note,
+    )
+
+
+def get_txn_reference_from_note(onchain_txn: dict) -> Optional[str]:
+    """Extracts the transaction reference an onchain transaction's note starts with, if any."""
+    note = onchain_txn.get("note")
+    if not note:
+        return None
+    try:
+        decoded_note = b64decode(note)[:TXN_REFERENCE_LENGTH].decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return decoded_note if decoded_note.startswith("fp_") else None
+
+
+def get_block_transaction_id(txn: dict, block: dict, has_genesis_id: bool) -> str:
+    """Computes the id of a transaction decoded from a msgpack block.
+
+    Blocks elide the genesis hash, and the genesis id when `hgi` is set, from their
+    transactions, so both are restored from the block header before hashing.
+    """
+    txn = {**txn, "gh": block["gh"]}
+    if has_genesis_id:
+        txn["gen"] = block["gen"]
+    encoded_txn = b64decode(encoding.msgpack_encode(txn))
+    txid = encoding.checksum(algosdk_constants.txid_prefix + encoded_txn)
+    return b32encode(txid).decode().rstrip("=")
+
+
+def to_indexer_transaction(txn: dict, txid: str) -> dict:
+    """Converts an algod transaction, either msgpack decoded from a block or from algod's
+    json responses, to the shape the indexer returns so it can be passed to
+    `verify_transaction`.
+    """
+
+    def address(value: Any) -> Optional[str]:
+        if isinstance(value, bytes):
+            return str(encoding.encode_address(value))
+        return str(value) if value is not None else None
+
+    note = txn.get("note")
+    onchain_txn = {
+        "id": txid,
+        "tx-type": txn["type"],
+        "sender": address(txn["snd"]),
+        "note": b64encode(note).decode() if isinstance(note, bytes) else note,
+    }
+    if txn["type"] == "pay":
+        onchain_txn["payment-transaction"] = {
+            "receiver": address(txn.get("rcv")),
+            "amount": txn.get("amt", 0),
+        }
+    elif txn["type"] == "axfer":
+        onchain_txn["asset-transfer-transaction"] = {
+            "receiver": address(txn.get("arcv")),
+            "amount": txn.get("aamt", 0),
+            "asset-id": txn.get("xaid", 0),
+        }
+    return onchain_txn
+
+
+def get_transaction_by_id(algod_client: Any, indexer_client: Any, txid: str) -> Optional[dict]:
+    """Looks up a transaction by its id, first on algod, which also knows transactions still
+    in the pending pool, then on the indexer.
+
+    Returns the transaction in the indexer's shape with its `confirmed-round`, 0 while it is
+    still pending, or None if it is unknown or was rejected from the pool.
+    """
+    try:
+        pending_txn = algod_client.pending_transaction_info(txid)
+    except AlgodHTTPError:
+        pass
+    else:
+        if pending_txn.get("pool-error"):
+            return None
+        onchain_txn = to_indexer_transaction(pending_txn["txn"]["txn"], txid)
+        onchain_txn["confirmed-round"] = pending_txn.get("confirmed-round", 0)
+        return onchain_txn
+
+    try:
+        return dict(indexer_client.transaction(txid)["transaction"])
+    except IndexerHTTPError:
+        return None
+
+
+def get_min_round(db_txns: Sequence[Transaction]) -> Optional[int]:
+    """Returns the round to resume searching for the given transactions from, or None if
+    any of them has never been checked and has to be searched for from scratch.
+    """
+    checked_rounds = [
+        db_txn.checked_round for db_txn in db_txns if db_txn.checked_round is not None
+    ]
+    if not checked_rounds or len(checked_rounds) < len(db_txns):
+        return None
+    return min(checked_rounds) + 1
+
+
+def search_recipient_transactions(
+    indexer_client: Any, recipient: str, min_round: int
+) -> Tuple[List[dict], int]:
+    """Fetches every payment and asset transfer received by `recipient` from `min_round`,
+    following the indexer's pagination.
+
+    Returns the transactions and the round the indexer had caught up to when searched.
+    May raise:
+    - IndexerHTTPError
+    """
+
+    onchain_txns: List[dict] = []
+    current_round = None
+    next_page = None
+    while True:
+        response = indexer_client.search_transactions(
+            limit=INDEXER_PAGE_LIMIT,
+            next_page=next_page,
+            address=recipient,
+            address_role="receiver",
+            min_round=min_round,
+        )
+        if current_round is None:
+            current_round = response["current-round"]
+        onchain_txns.extend(
+            txn for txn in response["transactions"] if txn["tx-type"] in ("pay", "axfer")
+        )
+        next_page = response.get("next-token")
+        if not next_page or len(response["transactions"]) < INDEXER_PAGE_LIMIT:
+            return onchain_txns, current_round
+
+
+def get_expired_transactions_completable_since() -> datetime:
+    """Returns when the oldest expired transactions that payments can still complete were
+    created, as a payment may land after its transaction expired.
+    """
+    return (
+        timezone.now()
+        - settings.PENDING_TRANSACTION_TTL
+        - settings.EXPIRED_TRANSACTION_GRACE_PERIOD
+    )
+
+
+def get_completable_transactions_filter() -> Q:
+    """Matches the transactions a payment can complete: pending ones and ones expired within
+    `EXPIRED_TRANSACTION_GRACE_PERIOD`.
+    """
+    return Q(status=TransactionStatus.PENDING) | Q(
+        status=TransactionStatus.EXPIRED,
+        created_at__gte=get_expired_transactions_completable_since(),
+    )
+
+
+def is_transaction_completable(db_txn: Transaction) -> bool:
+    """Tells whether a payment can complete `db_txn`, see `get_completable_transactions_filter`."""
+    if db_txn.status == TransactionStatus.EXPIRED:
+        return db_txn.created_at >= get_expired_transactions_completable_since()
+    return db_txn.status == TransactionStatus.PENDING
+
+
+def mark_transaction_as_successful(db_txn: Transaction, txn_hash: str) -> bool:
+    """Moves a pending transaction to success, adds it to its recipient's daily revenue and to
+    the counters of the payment link it was made to, and disables that link if one-time.
+
+    The status change is conditional on the transaction still being completable so concurrent
+    verifiers cannot complete the same transaction twice. Returns whether this call did it.
+    """
+    now = timezone.now()
+    with atomic():
+        updated = Transaction.objects.filter(
+            get_completable_transactions_filter(), uid=db_txn.uid
+        ).update(
+            status=TransactionStatus.SUCCESS,
+            txn_hash=txn_hash,
+            updated_at=now,
+        )
+        if not updated:
+            return False
+        db_txn.status = TransactionStatus.SUCCESS
+        db_txn.txn_hash = txn_hash
+        db_txn.updated_at = now
+        add_to_revenue(db_txn)
+
+        # verifiers fetch the payment link along with the transaction, its slug is at hand.
+        payment_link = db_txn.payment_link
+        if payment_link is not None:
+            counters: Dict[str, Any] = {
+                "total_revenue": F("total_revenue") + db_txn.amount,
+                "successful_payment_count": F("successful_payment_count") + 1,
+                "last_paid_at": now,
+                "updated_at": now,
+            }
+            if db_txn.amount > 0:
+                counters["is_active"] = Case(
+                    When(is_one_time=True, then=Value(False)), default=F("is_active")
+                )
+            PaymentLink.objects.filter(uid=payment_link.uid).update(**counters)
+            slug = payment_link.slug
+            on_commit(lambda: invalidate_payment_link_cache(slug))
+    return True
+
+
+def mark_transaction_as_failed(db_txn: Transaction) -> bool:
+    """Moves a transaction whose onchain transaction failed verification to failed.
+
+    Like `mark_transaction_as_successful`, the status change is conditional on the
+    transaction still being completable, so it never overrides a concurrent verifier that
+    completed it. Returns whether this call did it.
+    """
+    updated = Transaction.objects.filter(
+        get_completable_transactions_filter(), uid=db_txn.uid
+    ).update(status=TransactionStatus.FAILED)
+    if updated:
+        db_txn.status = TransactionStatus.FAILED
+    return bool(updated)
+
+
+def get_period_start(moment: datetime, granularity: RevenueGranularity) -> datetime:
+    """Returns the start of the hour, day, week or month `moment` falls in."""
+    if granularity == RevenueGranularity.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == RevenueGranularity.WEEK:
+        return day_start - timedelta(days=day_start.weekday())
+    if granularity == RevenueGranularity.MONTH:
+        return day_start.replace(day=1)
+    return day_start
+
+
+def get_period_end(period_start: datetime, granularity: RevenueGranularity) -> datetime:
+    """Returns the start of the period following the one starting at `period_start`."""
+    if granularity == RevenueGranularity.MONTH:
+        return (period_start + timedelta(days=32)).replace(day=1)
+    return (
+        period_start
+        + {
+            RevenueGranularity.HOUR: timedelta(hours=1),
+            RevenueGranularity.DAY: timedelta(days=1),
+            RevenueGranularity.WEEK: timedelta(weeks=1),
+        }[granularity]
+    )
+
+
+def add_to_revenue(db_txn: Transaction) -> None:
+    """Increments the revenue of a successful transaction's recipient for the day, and the
+    hour, week and month rollups, it succeeded in, creating the rows if needed.
+    """
+    try:
+        account = Account.objects.get(address=db_txn.recipient, is_verified=True)
+    except Account.DoesNotExist:
+        return
+
+    asset_uid = Asset.objects.values_list("uid", flat=True).get(asa_id=db_txn.asset_id)
+    lookup = {"account": account, "asset_id": asset_uid, "network": db_txn.network}
+    increment_revenue(DailyRevenue, {**lookup, "date": db_txn.updated_at.date()}, db_txn.amount)
+    for granularity in (
+        RevenueGranularity.HOUR,
+        RevenueGranularity.WEEK,
+        RevenueGranularity.MONTH,
+    ):
+        increment_revenue(
+            RevenueRollup,
+            {
+                **lookup,
+                "granularity": granularity,
+                "period_start": get_period_start(db_txn.updated_at, granularity),
+            },
+            db_txn.amount,
+        )
+
+
+def increment_revenue(model: Type[RevenueModel], lookup: Dict[str, Any], amount: Decimal) -> None:
+    """Atomically adds `amount` to the revenue row matching `lookup`, creating it first."""
+    model.objects.bulk_create([model(**lookup, amount=ZERO_AMOUNT)], ignore_conflicts=True)
+    model.objects.filter(**lookup).update(amount=F("amount") + amount, updated_at=timezone.now())
+
+
+def recalculate_payment_link_counters() -> int:
+    """Recomputes the revenue and payment counters of every payment link from its successful
+    transactions with one grouped aggregate. Returns the number of links corrected.
+    """
+    counters = {
+        counter["payment_link_id"]: counter
+        for counter in Transaction.objects.filter(
+            status=TransactionStatus.SUCCESS, payment_link__isnull=False
+        )
+        .values("payment_link_id")
+        .annotate(total=Sum("amount"), count=Count("uid"), last_paid_at=Max("updated_at"))
+        .order_by()
+    }
+    corrected = []
+    for payment_link in PaymentLink.objects.only(
+        "uid", "total_revenue", "successful_payment_count", "last_paid_at"
+    ).iterator():
+        counter = counters.get(payment_link.uid, {})
+        total_revenue = counter.get("total", ZERO_AMOUNT)
+        successful_payment_count = counter.get("count", 0)
+        last_paid_at = counter.get("last_paid_at")
+        if (
+            payment_link.total_revenue,
+            payment_link.successful_payment_count,
+            payment_link.last_paid_at,
+        ) != (total_revenue, successful_payment_count, last_paid_at):
+            payment_link.total_revenue = total_revenue
+            payment_link.successful_payment_count = successful_payment_count
+            payment_link.last_paid_at = last_paid_at
+            corrected.append(payment_link)
+    PaymentLink.objects.bulk_update(
+        corrected,
+        fields=["total_revenue", "successful_payment_count", "last_paid_at"],
+        batch_size=PAYMENT_LINK_COUNTERS_BATCH_SIZE,
+    )
+    return len(corrected)
+
+
+def prefetch_recent_transactions(
+    payment_links: Sequence[PaymentLink], limit: int = RECENT_TRANSACTIONS_LIMIT
+) -> None:
+    """Sets `recent_transactions` on every payment link to its `limit` latest transactions,
+    fetched for all the links with one query ranking each link's transactions and one
+    fetching their assets.
+    """
+    recent_transactions: Dict[UUID, List[Transaction]] = defaultdict(list)
+    if payment_links:
+        ranked = Transaction.objects.filter(payment_link__in=payment_links).annotate(
+            row_number=Window(
+                RowNumber(), partition_by=[F("payment_link_id")], order_by=F("created_at").desc()
+            )
+        )
+        # window functions can't be filtered on by the ORM, so the ranking is wrapped.
+        sql, params = ranked.query.sql_with_params()
+        for db_txn in Transaction.objects.raw(
+            f"SELECT * FROM ({sql}) AS ranked WHERE row_number <= %s ORDER BY created_at DESC",
+            (*params, limit),
+        ).prefetch_related("asset"):
+            recent_transactions[db_txn.payment_link_id].append(db_txn)
+    for payment_link in payment_links:
+        transactions = recent_transactions[payment_link.uid]
+        payment_link.recent_transactions = transactions  # type: ignore[attr-defined]
@@ -1,23 +1,44 @@
 import logging
-from typing import TYPE_CHECKING, Any, Dict, List, Type
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+from urllib.error import URLError
+from uuid import UUID
 
-from algosdk.error import IndexerHTTPError
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
 
-from django.conf import settings
-from django.db.models import Q, QuerySet
+from django.db.models import Count, Q, QuerySet
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from rest_framework import status
-from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.fields import DateTimeField
 from rest_framework.generics import (
     GenericAPIView,
     ListAPIView,
     ListCreateAPIView,
     RetrieveUpdateAPIView,
 )
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.parsers import BaseParser, FormParser, MultiPartParser
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.renderers import BaseRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 
@@ -27,20 +48,61 @@ from flashpay.apps.account.authentication import (
     PublicKeyAuthentication,
     SecretKeyAuthentication,
 )
-from flashpay.apps.account.models import APIKey
+from flashpay.apps.account.models import Account, APIKey
+from flashpay.apps.core.cache import single_flight
+from flashpay.apps.core.clients import get_algod_client, get_indexer_client
 from flashpay.apps.core.models import Network
+from flashpay.apps.core.paginators import CustomCursorPagination
 from flashpay.apps.core.utils import encrypt_fernet_message
-from flashpay.apps.payments.models import DailyRevenue, PaymentLink, Transaction, TransactionStatus
+from flashpay.apps.core.views import KeysetPaginationMixin
+from flashpay.apps.payments.constants import (
+    OPEN_RANGE_REVENUE_GRANULARITY,
+    PAYMENT_LINK_CACHE_TIMEOUT,
+    PAYMENT_LINK_NOT_FOUND_TIMEOUT,
+    REVENUE_AUTO_GRANULARITY,
+    REVENUE_COLUMNAR_FORMAT,
+    REVENUE_COLUMNAR_MAX_PERIODS,
+    REVENUE_GRANULARITY_BY_DATE_RANGE,
+    REVENUE_SUMMARY_TIMEOUT,
+    VERIFY_TRANSACTION_RESULT_TIMEOUT,
+    ZERO_AMOUNT,
+)
+from flashpay.apps.payments.models import (
+    DailyRevenue,
+    PaymentLink,
+    RevenueGranularity,
+    RevenueRollup,
+    Transaction,
+    TransactionStatus,
+)
 from flashpay.apps.payments.permissions import IsAuthenticatedAndOwner
 from flashpay.apps.payments.serializers import (
     CreatePaymentLinkSerializer,
     DailyRevenueSerializer,
+    PaymentLinkCheckoutSerializer,
     PaymentLinkSerializer,
+    RevenueRollupSerializer,
     TransactionDetailSerializer,
     TransactionSerializer,
     VerifyTransactionSerializer,
 )
-from flashpay.apps.payments.utils import verify_transaction
+from flashpay.apps.payments.tasks import schedule_transaction_verification
+from flashpay.apps.payments.utils import (
+    build_unsigned_transaction,
+    check_if_address_opted_in_asa,
+    generate_txn_reference,
+    get_payment_link_cache_key,
+    get_period_end,
+    get_period_start,
+    get_transaction_by_id,
+    get_txn_reference_from_note,
+    invalidate_payment_link_cache,
+    is_transaction_completable,
+    mark_transaction_as_failed,
+    mark_transaction_as_successful,
+    prefetch_recent_transactions,
+    verify_transaction,
+)
 
 if TYPE_CHECKING:
     from rest_framework.authentication import BaseAuthentication
@@ -50,12 +112,14 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-class PaymentLinkView(ListCreateAPIView):
+class PaymentLinkView(KeysetPaginationMixin, ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication, SecretKeyAuthentication]
 
     def get_queryset(self) -> QuerySet:
-        return PaymentLink.objects.filter(account=self.request.user, network=self.request.network)  # type: ignore[misc]  # noqa: E501
+        return PaymentLink.objects.filter(
+            account=self.request.user, network=self.request.network  # type: ignore[misc]
+        ).select_related("account", "asset")
 
     def get_serializer_class(self) -> Type["BaseSerializer"]:
         if self.request.method == "POST":
@@ -67,10 +131,20 @@ class PaymentLinkView(ListCreateAPIView):
             return [FormParser(), MultiPartParser()]
         return super().get_parsers()
 
+    def paginate_queryset(
+        self, queryset: Union[QuerySet, Sequence[Any]]
+    ) -> Optional[Sequence[Any]]:
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            prefetch_recent_transactions(cast(Sequence[PaymentLink], page))
+        return page
+
     def create(self, request: Request, *args: Dict, **kwargs: Dict) -> Response:
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        payment_link = serializer.save()
+        # the slug may have been looked up before it existed.
+        invalidate_payment_link_cache(payment_link.slug)
         return Response(
             {
                 "status_code": status.HTTP_201_CREATED,
@@ -93,8 +167,8 @@ class PaymentLinkView(ListCreateAPIView):
 
 
 class PaymentLinkDetailView(RetrieveUpdateAPIView):
-    queryset = PaymentLink.objects.get_queryset()
-    permission_classes = [IsAuthenticatedOrReadOnly]
+    queryset = PaymentLink.objects.select_related("account", "asset")
+    permission_classes: List[Type["BasePermission"]] = [IsAuthenticatedOrReadOnly]
     authentication_classes = [CustomJWTAuthentication, SecretKeyAuthentication]
     serializer_class = PaymentLinkSerializer
 
@@ -117,9 +191,10 @@ class PaymentLinkDetailView(RetrieveUpdateAPIView):
         return super().get_permissions()  # type: ignore
 
     def retrieve(self, request: Request, *args: Dict, **kwargs: Dict) -> Response:
-        payment_link = self.get_object()
-        updated_data = self.get_serializer(payment_link).data
-        updated_data["public_key"] = self.get_public_api_key(payment_link)
+        if isinstance(self.request.user, AnonymousUser):
+            updated_data = self.get_cached_payment_link_data()
+        else:
+            updated_data = self.get_payment_link_data(self.get_object())
 
         return Response(
             {
@@ -129,6 +204,30 @@ class PaymentLinkDetailView(RetrieveUpdateAPIView):
             }
         )
 
+    def get_payment_link_data(self, payment_link: PaymentLink) -> Dict[str, Any]:
+        updated_data = dict(self.get_serializer(payment_link).data)
+        updated_data["public_key"] = self.get_public_api_key(payment_link)
+        return updated_data
+
+    def get_payment_link_data_or_none(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.get_payment_link_data(self.get_object())
+        except Http404:
+            return None
+
+    def get_cached_payment_link_data(self) -> Dict[str, Any]:
+        # payers' views of a link are all the same, so they are cached, unknown slugs too.
+        data = single_flight(
+            key=get_payment_link_cache_key(self.kwargs["slug"]),
+            fn=self.get_payment_link_data_or_none,
+            result_timeout=lambda data: (
+                PAYMENT_LINK_CACHE_TIMEOUT if data is not None else PAYMENT_LINK_NOT_FOUND_TIMEOUT
+            ),
+        )
+        if data is None:
+            raise Http404("No PaymentLink matches the given query.")
+        return data
+
     def put(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         raise MethodNotAllowed("PUT")
 
@@ -160,6 +259,7 @@ class PaymentLinkDetailView(RetrieveUpdateAPIView):
             )
         payment_link.is_active = not payment_link.is_active
         payment_link.save()
+        invalidate_payment_link_cache(payment_link.slug)
 
         updated_data = self.get_serializer(payment_link).data
         return Response(
@@ -172,7 +272,97 @@ class PaymentLinkDetailView(RetrieveUpdateAPIView):
         )
 
 
-class TransactionsView(ListCreateAPIView):
+class PaymentLinkCheckoutView(PaymentLinkDetailView):
+    """Returns everything a payer needs to sign a payment to a link in one response: the link
+    with its asset and encrypted public key, whether its recipient can receive the asset, a
+    transaction reference to pass when creating the transaction and suggested params.
+    """
+
+    # the checkout is the same for everyone.
+    authentication_classes: List[Type["BaseAuthentication"]] = []
+    permission_classes = [AllowAny]
+    http_method_names = ["get"]
+
+    def retrieve(self, request: Request, *args: Dict, **kwargs: Dict) -> Response:
+        payment_link_data = self.get_cached_payment_link_data()
+        # links that can't be paid get no reference, as `POST /api/transactions` would refuse
+        # it and a payment signed with it would never be recorded.
+        unpayable_message = None
+        if not payment_link_data["is_active"]:
+            unpayable_message = "Payment link is not active."
+        elif payment_link_data["is_one_time"] and Decimal(payment_link_data["total_revenue"]):
+            unpayable_message = "You cannot make multiple payments to a one-time payment link."
+        if unpayable_message is not None:
+            return Response(
+                {
+                    "status_code": status.HTTP_400_BAD_REQUEST,
+                    "message": unpayable_message,
+                    "data": None,
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        network = Network(payment_link_data["network"])
+        try:
+            recipient_opted_in: Optional[bool] = check_if_address_opted_in_asa(
+                address=payment_link_data["creator"],
+                asset_id=payment_link_data["asset"]["asa_id"],
+                network=network,
+            )
+        except (AlgodHTTPError, URLError):
+            logger.warning("Unable to check if the recipient is opted in", exc_info=True)
+            recipient_opted_in = None
+        try:
+            suggested_params = get_algod_client(network).suggested_params()
+        except (AlgodHTTPError, URLError):
+            logger.warning(f"Unable to fetch {network} suggested params", exc_info=True)
+            suggested_params = None
+
+        serializer = PaymentLinkCheckoutSerializer(
+            {
+                "payment_link": payment_link_data,
+                "recipient_opted_in": recipient_opted_in,
+                "txn_reference": generate_txn_reference(UUID(payment_link_data["uid"])),
+                "suggested_params": suggested_params,
+            }
+        )
+        return Response(
+            {
+                "status_code": status.HTTP_200_OK,
+                "message": "Payment Link checkout returned successfully",
+                "data": serializer.data,
+            }
+        )
+
+
+class PaymentLinkTransactionsView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication, SecretKeyAuthentication]
+    serializer_class = TransactionDetailSerializer
+    pagination_class = CustomCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        payment_link = get_object_or_404(
+            PaymentLink,
+            slug=self.kwargs["slug"],
+            account=self.request.user,
+            network=self.request.network,
+        )
+        return payment_link.transactions.select_related("asset")
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        response = super().list(request, *args, **kwargs)
+        return Response(
+            {
+                "status_code": status.HTTP_200_OK,
+                "message": "Transactions returned successfully",
+                "data": response.data,
+            },
+            status.HTTP_200_OK,
+        )
+
+
+class TransactionsView(KeysetPaginationMixin, ListCreateAPIView):
     authentication_classes = [
         PublicKeyAuthentication,
         SecretKeyAuthentication,
@@ -192,15 +382,30 @@ class TransactionsView(ListCreateAPIView):
         return [PublicKeyAuthentication(), SecretKeyAuthentication()]
 
     def get_queryset(self) -> QuerySet:
+        return self.get_address_transactions()
+
+    def filter_keyset(self, queryset: QuerySet, condition: Q) -> QuerySet:
+        # a union can't be filtered, so it is rebuilt with the condition on both sides.
+        return self.get_address_transactions(condition)
+
+    def get_address_transactions(self, condition: Q = Q()) -> QuerySet:
         slug = self.request.query_params.get("slug", None)
-        qs = Transaction.objects.filter(
-            Q(recipient=self.request.user.address) | Q(sender=self.request.user.address),  # type: ignore[union-attr]  # noqa: E501
-            network=self.request.network,
+        address = self.request.user.address  # type: ignore[union-attr]
+        qs = (
+            Transaction.objects.filter(condition, network=self.request.network)
+            .select_related("asset")
+            .order_by()
         )
         if slug:
             payment_link = get_object_or_404(PaymentLink, slug=slug)
-            qs = qs.filter(txn_reference__icontains=payment_link.uid.hex)
-        return qs
+            qs = qs.filter(payment_link=payment_link)
+        # the received and sent transactions are read from their own index and merged, as the
+        # planner can't use either index to order `recipient = x OR sender = x`.
+        return (
+            qs.filter(recipient=address)
+            .union(qs.filter(sender=address).exclude(recipient=address), all=True)
+            .order_by("-created_at")
+        )
 
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         response = super().list(request, *args, **kwargs)
@@ -217,6 +422,7 @@ class TransactionsView(ListCreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         transaction = serializer.save()
+        schedule_transaction_verification(transaction)
         headers = self.get_success_headers(serializer.data)
         return Response(
             {
@@ -235,21 +441,27 @@ class VerifyTransactionView(GenericAPIView):
     transaction_serializer = TransactionDetailSerializer
     authentication_classes = [PublicKeyAuthentication, SecretKeyAuthentication]
 
+    @property
+    def algod_client(self):  # type: ignore
+        return get_algod_client(self.request.network)
+
     @property
     def indexer_client(self):  # type: ignore
-        return (
-            settings.TESTNET_INDEXER_CLIENT
-            if self.request.network == Network.TESTNET
-            else settings.MAINNET_INDEXER_CLIENT
-        )
+        return get_indexer_client(self.request.network)
 
     def post(self, request: Request, **kwargs: Dict[str, Any]) -> Response:
-        serializer = self.get_serializer(data={"txn_reference": kwargs["txn_reference"]})
+        data = {"txn_reference": kwargs["txn_reference"]}
+        if "txid" in request.data:
+            data["txid"] = request.data["txid"]
+        serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         txn_reference = serializer.validated_data["txn_reference"]
+        txid = serializer.validated_data.get("txid")
 
         try:
-            transaction = Transaction.objects.get(txn_reference=txn_reference)
+            transaction = Transaction.objects.select_related("asset", "payment_link").get(
+                txn_reference=txn_reference
+            )
         except Transaction.DoesNotExist:
             return Response(
                 data={
@@ -260,8 +472,8 @@ class VerifyTransactionView(GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Check if transaction has already been verified
-        if transaction.status != TransactionStatus.PENDING:
+        # Check if transaction has already been verified, an expired one may still be paid.
+        if not is_transaction_completable(transaction):
             return Response(
                 data={
                     "status_code": status.HTTP_409_CONFLICT,
@@ -271,108 +483,376 @@ class VerifyTransactionView(GenericAPIView):
                 status=status.HTTP_409_CONFLICT,
             )
 
-        try:
-            api_response = self.indexer_client.search_transactions(
-                note_prefix=txn_reference.encode(),
-                address=transaction.sender,
-                address_role="sender",
-            )
-        except IndexerHTTPError as e:
-            logger.error(
-                f"Error finding transaction with "
-                f'transaction id: {serializer.validated_data["txn_reference"]} '
-                f"due to: {str(e)}"
-            )
-            return Response(
-                data={
+        # concurrent polls for the same reference share a single lookup and its result.
+        payload = single_flight(
+            key=f"verify-txn:{txn_reference}",
+            fn=lambda: self.verify(transaction, txid),
+            result_timeout=VERIFY_TRANSACTION_RESULT_TIMEOUT,
+        )
+        return Response(data=payload, status=payload["status_code"])
+
+    def verify(self, transaction: Transaction, txid: Optional[str]) -> Dict[str, Any]:
+        """Looks up the onchain transaction of a pending transaction, updates its status
+        accordingly and returns the response payload.
+        """
+        txn_reference = transaction.txn_reference
+        onchain_txn = None
+        if txid is not None:
+            onchain_txn = get_transaction_by_id(self.algod_client, self.indexer_client, txid)
+            # the transaction must carry this reference, otherwise look it up by reference.
+            if (
+                onchain_txn is not None
+                and get_txn_reference_from_note(onchain_txn) != txn_reference
+            ):
+                onchain_txn = None
+        if onchain_txn is not None and not onchain_txn.get("confirmed-round"):
+            return {
+                "status_code": status.HTTP_202_ACCEPTED,
+                "message": "Transaction is pending confirmation",
+                "data": self.transaction_serializer(transaction).data,
+            }
+
+        if onchain_txn is not None:
+            api_response = {"transactions": [onchain_txn]}
+        else:
+            try:
+                api_response = self.indexer_client.search_transactions(
+                    note_prefix=txn_reference.encode(),
+                    address=transaction.sender,
+                    address_role="sender",
+                )
+            except IndexerHTTPError as e:
+                logger.error(
+                    f"Error finding transaction with "
+                    f"transaction id: {txn_reference} "
+                    f"due to: {str(e)}"
+                )
+                return {
                     "status_code": status.HTTP_400_BAD_REQUEST,
                     "message": "Transaction reference is invalid",
                     "data": None,
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+                }
+
+        # verify tx & update status and tx_hash accordingly, unless another verifier completed
+        # the transaction meanwhile, in which case its status is reported instead.
+        onchain_txns = api_response["transactions"]
+        if onchain_txns and verify_transaction(db_txn=transaction, onchain_txn=onchain_txns[0]):
+            if not mark_transaction_as_successful(
+                db_txn=transaction, txn_hash=onchain_txns[0]["id"]
+            ):
+                return self.get_completed_payload(transaction)
+            return {
+                "status_code": status.HTTP_200_OK,
+                "message": "Transaction verified successfully",
+                "data": self.transaction_serializer(transaction).data,
+            }
+
+        if not mark_transaction_as_failed(transaction):
+            return self.get_completed_payload(transaction)
+        return {
+            "status_code": status.HTTP_400_BAD_REQUEST,
+            "message": "Transaction verification failed",
+            "data": self.transaction_serializer(transaction).data,
+        }
+
+    def get_completed_payload(self, transaction: Transaction) -> Dict[str, Any]:
+        """Returns the response payload of a transaction a concurrent verifier completed."""
+        transaction.refresh_from_db()
+        if transaction.status == TransactionStatus.SUCCESS:
+            return {
+                "status_code": status.HTTP_200_OK,
+                "message": "Transaction verified successfully",
+                "data": self.transaction_serializer(transaction).data,
+            }
+        return {
+            "status_code": status.HTTP_409_CONFLICT,
+            "message": "Transaction has already been verified",
+            "data": self.transaction_serializer(transaction).data,
+        }
+
+
+class RevenueContentNegotiation(DefaultContentNegotiation):
+    """Lets `?format=columnar` pick the layout of revenue series rather than a renderer."""
+
+    def filter_renderers(
+        self, renderers: Iterable[BaseRenderer], format: str
+    ) -> List[BaseRenderer]:
+        if format == REVENUE_COLUMNAR_FORMAT:
+            return list(renderers)
+        return super().filter_renderers(renderers, format)
+
+
+class RevenueMixin(GenericAPIView):
+    """Reads the revenue of the authenticated account over the `date_range` and at the
+    `granularity` given in the query params, by day unless asked otherwise. `auto` picks the
+    coarsest granularity suiting the date range, see `REVENUE_GRANULARITY_BY_DATE_RANGE`.
+    """
+
+    @property
+    def account(self) -> Account:
+        return self.request.user  # type: ignore[return-value]
+
+    @property
+    def granularity(self) -> RevenueGranularity:
+        granularity = self.request.query_params.get("granularity", RevenueGranularity.DAY)
+        if granularity == REVENUE_AUTO_GRANULARITY:
+            date_range = self.request.query_params.get("date_range", "")
+            return RevenueGranularity(
+                REVENUE_GRANULARITY_BY_DATE_RANGE.get(date_range, OPEN_RANGE_REVENUE_GRANULARITY)
             )
+        if granularity not in RevenueGranularity.values:
+            choices = [*RevenueGranularity.values, REVENUE_AUTO_GRANULARITY]
+            raise ValidationError({"granularity": [f"Must be one of: {', '.join(choices)}."]})
+        return RevenueGranularity(granularity)
 
-        # verify tx & update status and tx_hash accordingly
-        try:
-            if verify_transaction(db_txn=transaction, onchain_txn=api_response["transactions"][0]):
-                transaction.status = TransactionStatus.SUCCESS
-                transaction.txn_hash = api_response["transactions"][0]["id"]
-                transaction.save(update_fields=["status", "txn_hash"])
-
-                # check if the txn is related to a one-time payment link and disable it.
-                try:
-                    # at this point, a valid txn reference is expected.
-                    supposed_payment_link_uid = txn_reference.split("_")[1]
-                    payment_link = PaymentLink.objects.get(uid=supposed_payment_link_uid)
-                    if payment_link.is_one_time and transaction.amount > 0:
-                        payment_link.is_active = False
-                        payment_link.save()
-                except PaymentLink.DoesNotExist:
-                    pass
-
-                return Response(
-                    data={
-                        "status_code": status.HTTP_200_OK,
-                        "message": "Transaction verified successfully",
-                        "data": self.transaction_serializer(transaction).data,
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            else:
-                transaction.status = TransactionStatus.FAILED
-                transaction.save(update_fields=["status"])
-                return Response(
-                    data={
-                        "status_code": status.HTTP_400_BAD_REQUEST,
-                        "message": "Transaction verification failed",
-                        "data": self.transaction_serializer(transaction).data,
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        except IndexError:
-            transaction.status = TransactionStatus.FAILED
-            transaction.save(update_fields=["status"])
-            return Response(
-                data={
-                    "status_code": status.HTTP_400_BAD_REQUEST,
-                    "message": "Transaction verification failed",
-                    "data": self.transaction_serializer(transaction).data,
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+    @property
+    def start(self) -> Optional[datetime]:
+        date_range = self.request.query_params.get("date_range")
+        now = timezone.now()
+        if date_range == "30d":
+            return now - timezone.timedelta(days=30)
+        elif date_range == "year":
+            return now.replace(month=1, day=1)
+        elif date_range == "6m":
+            return now - timezone.timedelta(days=30 * 6)
+        return None
+
+    def get_revenue_queryset(self) -> QuerySet:
+        start = self.start
+
+        # daily revenues are kept apart, every other granularity is read from its rollups.
+        granularity = self.granularity
+        if granularity == RevenueGranularity.DAY:
+            daily_revenues = DailyRevenue.objects.filter(
+                account=self.account, network=self.request.network
             )
+            if start is not None:
+                daily_revenues = daily_revenues.filter(date__gte=start.date())
+            return daily_revenues.order_by("date")
+
+        rollups = RevenueRollup.objects.filter(
+            account=self.account, network=self.request.network, granularity=granularity
+        )
+        if start is not None:
+            rollups = rollups.filter(period_start__gte=get_period_start(start, granularity))
+        return rollups.order_by("period_start")
+
+    def get_period_values(self, qs: QuerySet, *fields: str) -> List[Tuple[Any, ...]]:
+        """Returns `fields` of every revenue row of `qs` preceded by the start of its period."""
+        if self.granularity == RevenueGranularity.DAY:
+            return [
+                (timezone.make_aware(datetime.combine(day, datetime.min.time())), *values)
+                for day, *values in qs.values_list("date", *fields)
+            ]
+        return list(qs.values_list("period_start", *fields))
+
+    def get_columnar_series(self, amounts: Dict[datetime, Decimal]) -> Dict[str, List[str]]:
+        """Returns the revenue series as parallel lists of periods and amounts, with every
+        period without revenue up to now filled with zero.
+
+        Series longer than `REVENUE_COLUMNAR_MAX_PERIODS` periods are refused, e.g hours over
+        an open date range, as filling them would build tens of thousands of entries.
+        """
+        granularity = self.granularity
+        dates: List[str] = []
+        series: List[str] = []
+        start = self.start
+        if start is not None or amounts:
+            period = get_period_start(start if start is not None else min(amounts), granularity)
+            last_period = get_period_start(timezone.now(), granularity)
+            while period <= last_period:
+                if len(dates) == REVENUE_COLUMNAR_MAX_PERIODS:
+                    raise ValidationError(
+                        {
+                            "granularity": [
+                                f"Too many {granularity}s in the date range, "
+                                "pick a coarser granularity or a shorter date range."
+                            ]
+                        }
+                    )
+                dates.append(
+                    period.date().isoformat()
+                    if granularity == RevenueGranularity.DAY
+                    else DateTimeField().to_representation(period)
+                )
+                series.append(str(amounts.get(period, ZERO_AMOUNT)))
+                period = get_period_end(period, granularity)
+        return {"dates": dates, "amounts": series}
 
 
-class DailyRevenueView(ListAPIView):
+class DailyRevenueView(RevenueMixin, ListAPIView):
     authentication_classes = [CustomJWTAuthentication]
     permission_classes = [IsAuthenticated]
-    serializer_class = DailyRevenueSerializer
+    content_negotiation_class = RevenueContentNegotiation
     pagination_class = None
 
+    def get_serializer_class(self) -> Type["BaseSerializer"]:
+        if self.granularity == RevenueGranularity.DAY:
+            return DailyRevenueSerializer
+        return RevenueRollupSerializer
+
     def get_queryset(self) -> QuerySet:
         asa_id = self.request.query_params.get("asa_id", None)
-        date_range = self.request.query_params.get("date_range")
-        qs = DailyRevenue.objects.filter(
-            account=self.request.user,
-            asset__asa_id=asa_id,
-            network=self.request.network,
-        )  # type: ignore
-        if date_range == "30d":
-            start = timezone.now() - timezone.timedelta(days=30)
-            qs = qs.filter(created_at__date_gte=start.date())
-        elif date_range == "year":
-            qs = qs.filter(created_at__year=timezone.now().year)
-        elif date_range == "6m":
-            start = timezone.now() - timezone.timedelta(days=30 * 6)
-            qs = qs.filter(created_at__date_gte=start.date())
-        return qs.order_by("created_at")
+        return self.get_revenue_queryset().filter(asset__asa_id=asa_id).select_related("asset")
+
+    def get_columnar_revenue(self) -> Dict[str, Any]:
+        """Returns the revenue series of the asset in columnar form, read with a single query."""
+        try:
+            asa_id = int(self.request.query_params.get("asa_id", ""))
+        except ValueError:
+            raise ValidationError({"asa_id": ["A valid integer is required."]})
+
+        amounts: Dict[datetime, Decimal] = {
+            period_start: amount
+            for period_start, amount in self.get_period_values(self.get_queryset(), "amount")
+        }
+        return {"asa_id": asa_id, **self.get_columnar_series(amounts)}
 
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("format") == REVENUE_COLUMNAR_FORMAT:
+            data = self.get_columnar_revenue()
+        else:
+            data = super().list(request, *args, **kwargs).data
         return Response(
             {
                 "status_code": status.HTTP_200_OK,
                 "message": "Revenue returned successfully",
-                "data": response.data,
+                "data": data,
+            },
+            status.HTTP_200_OK,
+        )
+
+
+class RevenueSummaryView(RevenueMixin, GenericAPIView):
+    authentication_classes = [CustomJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Returns the revenue series and total, and the number of transactions by status, of
+        every asset the account was paid in over the date range.
+
+        Computed with one query on the revenues and one grouped query on the transactions.
+        """
+        revenues: Dict[int, Dict[datetime, Decimal]] = defaultdict(dict)
+        for period_start, asa_id, amount in self.get_period_values(
+            self.get_revenue_queryset(), "asset__asa_id", "amount"
+        ):
+            revenues[asa_id][period_start] = amount
+
+        transactions = Transaction.objects.filter(
+            recipient=self.account.address, network=self.request.network
+        )
+        start = self.start
+        if start is not None:
+            transactions = transactions.filter(created_at__gte=start)
+        counts: Dict[int, Dict[str, int]] = defaultdict(
+            lambda: dict.fromkeys(TransactionStatus.values, 0)
+        )
+        for asa_id, txn_status, count in (
+            transactions.order_by().values_list("asset_id", "status").annotate(count=Count("uid"))
+        ):
+            counts[asa_id][txn_status] = count
+
+        assets = []
+        for asa_id in sorted(revenues.keys() | counts.keys()):
+            amounts = revenues[asa_id]
+            status_counts = counts[asa_id]
+            total_count = sum(status_counts.values())
+            assets.append(
+                {
+                    "asa_id": asa_id,
+                    "total_revenue": str(sum(amounts.values(), ZERO_AMOUNT)),
+                    **self.get_columnar_series(amounts),
+                    "transactions": {"total": total_count, **status_counts},
+                    "success_ratio": (
+                        status_counts[TransactionStatus.SUCCESS] / total_count
+                        if total_count
+                        else 0
+                    ),
+                    "failure_ratio": (
+                        status_counts[TransactionStatus.FAILED] / total_count if total_count else 0
+                    ),
+                }
+            )
+        return {"assets": assets}
+
+    def get(self, request: Request) -> Response:
+        key = ":".join(
+            [
+                "revenue-summary",
+                request.network,
+                str(request.user.pk),
+                self.granularity,
+                request.query_params.get("date_range", ""),
+            ]
+        )
+        data = single_flight(key=key, fn=self.get_summary, result_timeout=REVENUE_SUMMARY_TIMEOUT)
+        return Response(
+            {
+                "status_code": status.HTTP_200_OK,
+                "message": "Revenue summary returned successfully",
+                "data": data,
             },
             status.HTTP_200_OK,
         )
+
+
+class UnsignedTransactionView(GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [PublicKeyAuthentication, SecretKeyAuthentication]
+
+    def get(self, request: Request, **kwargs: Dict[str, Any]) -> Response:
+        transaction = get_object_or_404(
+            Transaction.objects.select_related("asset"),
+            txn_reference=kwargs["txn_reference"],
+            recipient=request.user.address,  # type: ignore[union-attr]
+            network=request.network,
+        )
+        if transaction.status != TransactionStatus.PENDING:
+            return Response(
+                data={
+                    "status_code": status.HTTP_409_CONFLICT,
+                    "message": "Transaction has already been verified",
+                    "data": TransactionDetailSerializer(transaction).data,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            # shared by every request on the network for a few seconds.
+            suggested_params = get_algod_client(Network(transaction.network)).suggested_params()
+        except (AlgodHTTPError, URLError):
+            logger.warning(
+                f"Unable to fetch {transaction.network} suggested params", exc_info=True
+            )
+            return Response(
+                data={
+                    "status_code": status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "message": "Unable to reach the network, try again later",
+                    "data": None,
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        try:
+            onchain_txn = build_unsigned_transaction(transaction, suggested_params)
+        except ValueError as e:
+            return Response(
+                data={
+                    "status_code": status.HTTP_400_BAD_REQUEST,
+                    "message": str(e),
+                    "data": None,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            data={
+                "status_code": status.HTTP_200_OK,
+                "message": "Unsigned transaction returned successfully",
+                "data": {
+                    "txid": onchain_txn.get_txid(),
+                    # base64 encoded msgpack, as wallets expect it.
+                    "txn": encoding.msgpack_encode(onchain_txn),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -6,6 +6,7 @@ from cryptography.fernet import Fernet
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from django.conf import settings
+from django.core.cache import cache
 
 from rest_framework.test import APIClient
 
@@ -16,6 +17,12 @@ if TYPE_CHECKING:
     from flashpay.apps.account.models import Account, APIKey
 
 
+@pytest.fixture(autouse=True)
+def clear_cache() -> Any:
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client() -> Any:
     return APIClient()
@@ -245,6 +245,24 @@ HUEY = {
         "worker_type": "thread",
     },
 }
+# Verify pending transactions with one indexer sweep per recipient instead of one
+# search per pending transaction.
+BATCHED_TRANSACTIONS_VERIFICATION = env.bool("BATCHED_TRANSACTIONS_VERIFICATION", default=True)
+
+# Maximum number of concurrent indexer lookups per network while verifying transactions.
+TRANSACTIONS_VERIFICATION_MAX_WORKERS = {
+    "testnet": env.int("TESTNET_VERIFICATION_MAX_WORKERS", default=4),
+    "mainnet": env.int("MAINNET_VERIFICATION_MAX_WORKERS", default=4),
+}
+
+# Pending transactions older than this are marked as expired.
+PENDING_TRANSACTION_TTL = timedelta(hours=env.int("PENDING_TRANSACTION_TTL_HOURS", default=24))
+
+# Expired transactions are still completed by payments landing this long after they expired.
+EXPIRED_TRANSACTION_GRACE_PERIOD = timedelta(
+    hours=env.int("EXPIRED_TRANSACTION_GRACE_PERIOD_HOURS", default=24)
+)
+
 FLASHPAY_MASTER_WALLET = "ZTFRJ36LCYELJMIHLK3CLXA7CAQX6T5T3DFWWXOAT462HXLBZCSUWJCXIY"
 DEFAULT_PAYMENT_LINK_IMAGE = (
     "https://asset.cloudinary.com/flashpay/f6e11bc25a974729eb5fe362024e2c0d"
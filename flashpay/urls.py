@@ -1,7 +1,13 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from flashpay.apps.payments.views import DailyRevenueView, TransactionsView, VerifyTransactionView
+from flashpay.apps.payments.views import (
+    DailyRevenueView,
+    RevenueSummaryView,
+    TransactionsView,
+    UnsignedTransactionView,
+    VerifyTransactionView,
+)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -10,7 +16,9 @@ urlpatterns = [
     path("api/accounts", include("flashpay.apps.account.urls")),
     path("api/transactions", TransactionsView.as_view()),
     path("api/transactions/verify/<str:txn_reference>", VerifyTransactionView.as_view()),
+    path("api/transactions/unsigned/<str:txn_reference>", UnsignedTransactionView.as_view()),
     path("api/daily-revenue", DailyRevenueView.as_view()),
+    path("api/revenue-summary", RevenueSummaryView.as_view()),
 ]
 handler404 = "flashpay.apps.core.views.handler_404"
 handler500 = "flashpay.apps.core.views.handler_500"